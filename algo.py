@@ -1,5 +1,10 @@
+import heapq
+from multiprocessing import Pool, Value
+from time import time
 import networkx as nx
-from pq import MyPQ
+import numpy as np
+from metrics import METRICS
+from pq import BoundedPQ, MyPQ, PathStore
 
 class SortedEdgeScoreList():
     """
@@ -8,9 +13,13 @@ class SortedEdgeScoreList():
         to get demand by edge, use Ld.edge2d[edge]
     """
     def __init__(self, unsorted_score_edge_list, sn: int) -> None:
-        # list with descending demand value with limited length of sn
+        # list with descending demand value with limited length of sn, sn == -1 means no limit
         # each element is a tuple (edge, demand)
-        sortedlist = sorted(unsorted_score_edge_list, key=lambda x: x[1], reverse=True)[:sn]
+        # when only the top sn are kept, a partial selection is enough. nlargest keeps the same order as sorted
+        if 0 <= sn < len(unsorted_score_edge_list):
+            sortedlist = heapq.nlargest(sn, unsorted_score_edge_list, key=lambda x: x[1])
+        else:
+            sortedlist = sorted(unsorted_score_edge_list, key=lambda x: x[1], reverse=True)
         edge_tuple, demand_tuple = zip(*sortedlist)
         assert any(d >= 0 for d in demand_tuple) # please don't use negtive score
         self.edges = list(edge_tuple)
@@ -51,15 +60,219 @@ def get_candidate_edges(vrnet: nx.Graph, sn: int):
     return SortedEdgeScoreList(edge_score_list, sn)
 
 
-def find_tfvrpath(tfvrnet: nx.Graph, sn: int, itmax: int) -> list:
+class DemandNeighbors():
+    """
+        integer relabeled tfvrnet restricted to the edges in Ld
+        - nodes[i] is the node with id i, index[node] is the id of node
+        - demand[i, j] is the Ld demand of edge (i, j), -1 if the edge is not in Ld
+        - nbrs[i] is the list of neighbor ids of i in descending demand order
+        - nbr_demands[i] is the list of demands in the same order as nbrs[i]
+
+        only positive demands are kept in nbrs because expansion never picks an edge with zero demand.
+        ties keep the tfvrnet neighbor order, so the first valid neighbor is the same one the dict engine picks
+    """
+    def __init__(self, tfvrnet: nx.Graph, ld: SortedEdgeScoreList) -> None:
+        self.nodes = list(tfvrnet.nodes())
+        self.index = {n: i for i, n in enumerate(self.nodes)}
+        n = len(self.nodes)
+        self.demand = np.full((n, n), -1.0)
+        if ld.edges:
+            us, vs = zip(*((self.index[u], self.index[v]) for u, v in ld.edges))
+            self.demand[us, vs] = ld.demands
+            self.demand[vs, us] = ld.demands
+        # stable sort keeps the column order, which is the tfvrnet neighbor order, among ties
+        order = np.argsort(-self.demand, axis=1, kind='stable')
+        counts = np.count_nonzero(self.demand > 0, axis=1)
+        self.nbrs = [order[i, :counts[i]].tolist() for i in range(n)]
+        self.nbr_demands = [self.demand[i, self.nbrs[i]].tolist() for i in range(n)]
+
+    def best_two(self, end: int, mask: int) -> tuple:
+        """
+            input: end node id, bitset of the node ids in path
+            return: best neighbor not in path, its demand, second best neighbor, its demand
+                    missing neighbors are None with demand 0
+        """
+        found = []
+        for v, d in zip(self.nbrs[end], self.nbr_demands[end]):
+            if not mask >> v & 1:
+                found.append((v, d))
+                if len(found) == 2:
+                    break
+        found += [(None, 0)] * (2 - len(found))
+        return (*found[0], *found[1])
+
+
+def seed_bounds(ld: SortedEdgeScoreList, k: int) -> list:
+    """
+        input: Ld, K
+        return: list of (upper bound, cursor) for the seed path of every edge in Ld, in Ld order
+
+        the sum of all demands is computed once instead of once per seed
+    """
+    total = sum(ld.demands)
+    bounds = [(total, k - 1)] * min(k, len(ld))
+    bounds += [(total - ld.demands[k - 1] + d, k - 2) for d in ld.demands[k:]]
+    return bounds
+
+
+def make_pq(max_queue: int = None):
+    """
+        input: queue size limit, None for unbounded
+        return: descending priority queue for ETA
+    """
+    if max_queue is None:
+        return MyPQ(order='descending')
+    return BoundedPQ(order='descending', maxlen=max_queue)
+
+
+def report_beam(pq, omax: float) -> bool:
+    """
+        input: priority queue after the search, Omax
+        return: whether no evicted path could have beaten Omax
     """
-        input: transformed virtual network, seeding number, iteration max
+    if not isinstance(pq, BoundedPQ):
+        return True
+    optimal = pq.max_evicted_key is None or pq.max_evicted_key <= omax
+    METRICS.incr('evicted paths', pq.evicted)
+    print(f'bounded queue: evicted {pq.evicted} paths, best evicted upper bound: {pq.max_evicted_key}, Omax: {omax}, '
+          + ('result is as good as with an unbounded queue' if optimal else 'an evicted path might have been better'))
+    return optimal
+
+
+def report_gap(pq, omax: float, top_ub: float = None) -> float:
+    """
+        input: priority queue after the search, Omax, upper bound of the path popped when the search was stopped
+            by itmax or the time budget, None if the search ran out of paths that can beat Omax
+        return: how much better than Omax a path could still be
+    """
+    bounds = [b for b in (top_ub, getattr(pq, 'max_evicted_key', None)) if b is not None]
+    gap = max([0] + [b - omax for b in bounds])
+    METRICS.peak('peak upper bound gap', gap)
+    if top_ub is not None:
+        print(f'search stopped with Omax {omax}, top of queue upper bound {top_ub}, gap {gap}')
+    return gap
+
+
+def count_search(it: int, pushes: int, pops: int, prunes: int, peak_queue: int, peak_length: int) -> None:
+    METRICS.incr('iterations', it)
+    METRICS.incr('pushes', pushes)
+    METRICS.incr('pops', pops)
+    METRICS.incr('dominance prunes', prunes)
+    METRICS.peak('peak queue size', peak_queue)
+    METRICS.peak('peak path length', peak_length)
+
+
+def warm_start_path(ld: SortedEdgeScoreList, prev_path: list, nodes: list, demand=None) -> tuple:
+    """
+        input: Ld, a path found before on another set of nodes, nodes of the current tfvrnet,
+            function (u, v) -> demand of an edge, default is its demand in Ld and -inf if it is not in Ld
+        return: (objective, path) of prev_path patched to visit exactly the current nodes,
+            None if one of its edges has no demand
+
+        nodes that are gone are dropped from the path, and every new node is inserted where it adds the
+        most demand, between two neighboring nodes or at an end of an open path
+    """
+    is_circle = len(prev_path) > 2 and prev_path[0] == prev_path[-1]
+    node_set = set(nodes)
+    path = [n for n in (prev_path[:-1] if is_circle else prev_path) if n in node_set]
+    if demand is None:
+        demand = lambda u, v: ld.edge2d.get((u, v), float('-inf'))
+    for x in nodes:
+        if x in path:
+            continue
+        if not path:
+            path = [x]
+            continue
+        # gain of inserting x before path[i], i == len(path) is after the last node
+        pairs = list(zip(path, path[1:] + ([path[0]] if is_circle else [])))
+        gains = [demand(u, x) + demand(x, v) - demand(u, v) for u, v in pairs]
+        positions = list(range(1, len(pairs) + 1))
+        if not is_circle:
+            gains += [demand(x, path[0]), demand(path[-1], x)]
+            positions += [0, len(path)]
+        i = positions[max(range(len(gains)), key=gains.__getitem__)]
+        path.insert(i, x)
+    if is_circle:
+        path.append(path[0])
+    objective = sum(demand(u, v) for u, v in zip(path, path[1:]))
+    if objective == float('-inf') or len(path) < 2:
+        return None
+    return objective, path
+
+
+def finish_search(tfvrnet: nx.Graph, ld: SortedEdgeScoreList, omax: float, mu: list, stop: str, gap: float,
+                  optimal: bool, on_improve=None, time_seeding: float = None, report: dict = None) -> list:
+    """
+        input: transformed virtual network, Ld, Omax and mu of a search, None or what stopped it ('itmax' or
+            'time budget'), gap of report_gap, result of report_beam, on_improve, start time of seeding and
+            report dict of find_tfvrpath
+        return: mu, with the nodes it misses inserted by warm_start_path if the time budget stopped the search
+
+        a search stopped by the time budget usually has not visited every node yet. the missing nodes are
+        inserted by the same demand as Ld, max weight - weight, read from tfvrnet so that edges beyond the
+        top sn count too. a search stopped by itmax returns mu as it is, like before the time budget
+    """
+    nodes = list(tfvrnet.nodes())
+    if report is not None:
+        report.update({'Stopped': stop, 'Completed': 0, 'Gap': gap, 'Provably optimal': optimal and stop is None})
+    if stop != 'time budget' or set(mu) == set(nodes):
+        return mu
+    max_weight = max(attr['weight'] for _, _, attr in tfvrnet.edges(data=True))
+    demand = lambda u, v: max_weight - tfvrnet.edges[u, v]['weight'] if tfvrnet.has_edge(u, v) else float('-inf')
+    completed = warm_start_path(ld, mu, nodes, demand)
+    if completed is None:
+        print(f'can not complete the path of the stopped search, it misses {len(set(nodes) - set(mu))} nodes')
+        return mu
+    print(f'completed the path of the stopped search: {len(set(nodes) - set(mu))} nodes inserted, '
+          f'objective {omax} -> {completed[0]}')
+    if report is not None:
+        report['Completed'] = len(set(nodes) - set(mu))
+    if on_improve is not None:
+        on_improve(completed[0], completed[1], time() - time_seeding)
+    return completed[1]
+
+
+def find_tfvrpath(
+        tfvrnet: nx.Graph, sn: int, itmax: int, engine: str = 'dict', max_queue: int = None,
+        workers: int = 1, warm_start: list = None, time_budget: float = None, on_improve=None,
+        report: dict = None) -> list:
+    """
+        input: transformed virtual network, seeding number, iteration max, expansion engine, queue size limit,
+            number of worker processes, path found before on a tfvrnet with a few other nodes,
+            seconds the search may take, function called as on_improve(Omax, mu, elapsed seconds) for
+            the first mu and every better one, dict to put how the search ended in
         return: found path
+
+        with max_queue, the queue keeps only the max_queue paths with the highest upper bounds.
+        this bounds memory but may lose the best path, which is reported after the search
+
+        engine:
+        - 'dict': scan tfvrnet.neighbors and look up Ld.edge2d for every expansion
+        - 'array': scan pre-sorted neighbor lists of integer node ids with a bitset of path nodes
+
+        with workers > 1 (array engine only), the seeds are dealt to the workers and searched as in
+        eta_portfolio
+
+        with warm_start, the search starts with the patched warm_start (see warm_start_path) as mu and its
+        objective as Omax instead of the best seed, so only paths that can beat it are expanded
+
+        with time_budget, the expansion stops at time_budget seconds after the seeding started, like at itmax.
+        the gap between Omax and the upper bound of the top of the queue, which bounds how much better the
+        full search could be, is printed and kept as a metrics counter. the best mu so far is completed
+        with the nodes it misses (see finish_search) and returned.
+        on_improve is also called for the completed mu. the portfolio search calls it only for the
+        best mu of all workers
+
+        report gets 'Stopped' (None, 'itmax' or 'time budget'), 'Completed' (number of nodes inserted into
+        mu without being searched), 'Gap' and 'Provably optimal' (the search was not stopped and no path
+        evicted by max_queue could have beaten mu, so mu is as good as with an unbounded queue)
     """
+    assert engine in ('dict', 'array')
+    assert workers == 1 or engine == 'array'
 
     ######## VARIABLE INITIALIZATION
 
-    pq = MyPQ(order='descending')   # priority queue
+    pq = make_pq(max_queue)         # priority queue
     dt = dict()                     # domination table
     k = tfvrnet.number_of_nodes()+1 # maximum number of node in final path, +1 because we allow circle
     ld = None                       # list of edges sorted in descending order base on their demand
@@ -73,6 +286,8 @@ def find_tfvrpath(tfvrnet: nx.Graph, sn: int, itmax: int) -> list:
 
     #### initialization phase
 
+    time_seeding = time()
+    deadline = None if time_budget is None else time_seeding + time_budget
     ld = get_candidate_edges(tfvrnet, sn)
     assert len(ld) >= k
 
@@ -82,25 +297,56 @@ def find_tfvrpath(tfvrnet: nx.Graph, sn: int, itmax: int) -> list:
     # because no connectivity involved, Omax == Odmax
     omax = ld.demands[0]
     mu = [*ld.edges[0]] # tuple unpacking
+    warm = None
 
-    # push path seeds into Q
-    for i, e in enumerate(ld.edges):
-        if i < k:
-            cursor = k - 1
-            d_ub = sum(ld.demands) # ub = upper bound
+    if warm_start is not None:
+        warm = warm_start_path(ld, warm_start, list(tfvrnet.nodes()))
+        if warm is not None and warm[0] > omax:
+            omax, mu = warm
+            print(f'warm start with Omax {omax}')
         else:
-            cursor = k - 2
-            d_ub = (sum(ld.demands) - ld.demands[k - 1] + ld.edge2d[e])
-        pq.push(d_ub, [*e], ld.edge2d[e], cursor)
+            print('warm start path is not better than the best seed, starting cold')
+            warm = None
+
+    if workers > 1:
+        omax, mu, stop, gap, optimal = eta_portfolio(
+            tfvrnet, ld, k, itmax, max_queue, workers, time_seeding, warm, deadline)
+        if on_improve is not None:
+            on_improve(omax, mu, time() - time_seeding)
+        return finish_search(tfvrnet, ld, omax, mu, stop, gap, optimal, on_improve, time_seeding, report)
+    if engine == 'array':
+        omax, mu, stop, gap, optimal = eta_array(
+            tfvrnet, ld, k, itmax, omax, mu if warm is not None else None, max_queue, time_seeding,
+            deadline=deadline, on_improve=on_improve)
+        return finish_search(tfvrnet, ld, omax, mu, stop, gap, optimal, on_improve, time_seeding, report)
+    if on_improve is not None:
+        on_improve(omax, mu, time() - time_seeding)
+
+    # push path seeds into Q with one heapify
+    pq.extend(
+        (d_ub, [*e], d, cursor) # ub = upper bound
+        for e, d, (d_ub, cursor) in zip(ld.edges, ld.demands, seed_bounds(ld, k))
+    )
+    pushes = peak_queue = len(pq)
+    pops = prunes = 0
+    peak_length = 2
+    time_expansion = time()
+    METRICS.add_time('seeding', time_expansion - time_seeding)
 
     #### expansion phase
 
+    top_ub = stop = None
     while pq:
         ocpub, cp, ocp, cur = pq.pop()
+        pops += 1
         # print(it, 'pop:', ocpub, cp, ocp, cur)
-        if ocpub < omax or (it >= itmax or itmax == -1):
+        if ocpub < omax:
             # print("break", ocpub, Omax, cur, it)
             break
+        if (itmax != -1 and it >= itmax) or (deadline is not None and time() >= deadline):
+            stop = 'itmax' if itmax != -1 and it >= itmax else 'time budget'
+            top_ub = ocpub
+            break
         it += 1
 
         # expansion from two ends with best neighbors
@@ -143,6 +389,7 @@ def find_tfvrpath(tfvrnet: nx.Graph, sn: int, itmax: int) -> list:
             cp = [be] + cp
         if ee is not None:
             cp = cp + [ee]
+        peak_length = max(peak_length, len(cp))
 
         if be == ee:
             ocp = maxd_be + ocp
@@ -151,6 +398,8 @@ def find_tfvrpath(tfvrnet: nx.Graph, sn: int, itmax: int) -> list:
 
         if ocp > omax:
             omax, mu = ocp, cp
+            if on_improve is not None:
+                on_improve(omax, mu, time() - time_seeding)
             # print('new mu', ocpub, cp, ocp, cur, 'omax', omax)
             # print('new mu', ocpub, len(cp), ocp, cur)
 
@@ -186,6 +435,233 @@ def find_tfvrpath(tfvrnet: nx.Graph, sn: int, itmax: int) -> list:
                 # print('push:', ocpub, cp, ocp, cur)
                 # print('push:', ocpub, len(cp), ocp, cur)
                 pq.push(ocpub, cp, ocp, cur)
+                pushes += 1
+                peak_queue = max(peak_queue, len(pq))
+            else:
+                prunes += 1
 
     # print(f'findVirtualPath: {time()-time_begin} seconds')
-    return mu
+    METRICS.add_time('expansion', time() - time_expansion)
+    count_search(it, pushes, pops, prunes, peak_queue, peak_length)
+    optimal = report_beam(pq, omax)
+    gap = report_gap(pq, omax, top_ub)
+    return finish_search(tfvrnet, ld, omax, mu, stop, gap, optimal, on_improve, time_seeding, report)
+
+
+def eta_array(
+        tfvrnet: nx.Graph, ld: SortedEdgeScoreList, k: int, itmax: int, omax: float, mu: list,
+        max_queue: int = None, time_seeding: float = None, part: tuple = (0, 1), shared_omax=None,
+        deadline: float = None, on_improve=None) -> tuple:
+    """
+        input: transformed virtual network, Ld, K, iteration max, initial Omax, warm start mu or None to start
+            from the first seed, queue size limit, start time of seeding for metrics, (index, number) of the seed
+            part to search, multiprocessing Value of the best Omax of all parts, time() to stop expanding at,
+            function called as on_improve(Omax, mu, seconds since time_seeding) for the first mu and every better one
+        return: Omax, found path, None or what stopped the search ('itmax' or 'time budget'), gap of report_gap,
+            result of report_beam
+
+        same expansion as find_tfvrpath, but on integer node ids: the best and second best extension
+        of an end is the first two neighbors in its sorted list that are not in the bitset of the path,
+        so each expansion is a short scan instead of O(deg * |cp|).
+        the second best is the true second best neighbor, the dict engine only keeps the previous best.
+        paths are kept in a PathStore and queue entries only hold their handle, so nothing is copied per expansion.
+        a path is added to the store only when it is pushed or becomes mu
+    """
+    dn = DemandNeighbors(tfvrnet, ld)
+    ps = PathStore()
+    pq = make_pq(max_queue)
+    dt = dict()
+    it = 0
+
+    # a queue entry is (ub, handle, o, cur, first node, last node, length, bitset of nodes)
+    # the path itself lives in the path store, so every entry has the same small size.
+    # the handle comes right after ub, so ties pop the oldest path first and the bitsets are never compared
+
+    # push path seeds into Q with one heapify
+    seeds = []
+    for i, ((u, v), d, (d_ub, cursor)) in enumerate(zip(ld.edges, ld.demands, seed_bounds(ld, k))):
+        if i % part[1] != part[0]:
+            continue
+        u, v = dn.index[u], dn.index[v]
+        seeds.append((d_ub, ps.new(u, v), d, cursor, u, v, 2, (1 << u) | (1 << v)))
+    pq.extend(seeds)
+    pushes = peak_queue = len(pq)
+    pops = prunes = 0
+    peak_length = 2
+    time_expansion = time()
+    METRICS.add_time('seeding', time_expansion - (time_seeding or time_expansion))
+
+    if mu is not None:
+        # the warm start path goes to the path store as a seed that is never expanded
+        nodes = [dn.index[n] for n in mu]
+        handle = ps.new(nodes[0], nodes[1])
+        for n in nodes[2:]:
+            handle = ps.extend(handle, -1, n)
+        mu = handle
+    else:
+        # mu is the first seed of this part, which is the first seed of Ld for part 0
+        mu = 0
+        if part[0] > 0:
+            omax = ld.demands[part[0]]
+    # paths are pruned by the best Omax of all parts, mu and omax stay the best of this part
+    bound = omax
+    if on_improve is not None:
+        on_improve(omax, [dn.nodes[n] for n in ps.path(mu)], time() - (time_seeding or time_expansion))
+
+    top_ub = stop = None
+    while pq:
+        ocpub, cp, ocp, cur, first, last, length, mask = pq.pop()
+        pops += 1
+        # alone, the bound is this search's own Omax, like the dict engine
+        bound = omax if shared_omax is None else max(omax, shared_omax.value)
+        if ocpub < bound:
+            break
+        if (itmax != -1 and it >= itmax) or (deadline is not None and time() >= deadline):
+            stop = 'itmax' if itmax != -1 and it >= itmax else 'time budget'
+            top_ub = ocpub
+            break
+        it += 1
+
+        be, maxd_be, b_second_highest_e, b_second_highest_d_e = dn.best_two(first, mask)
+        ee, maxd_ee, e_second_highest_e, e_second_highest_d_e = dn.best_two(last, mask)
+
+        if be is None and ee is None:
+            continue
+
+        # be == ee is allowed to happen only when len(cp) >= k - 2
+        if be == ee:
+            if length < k - 2:
+                if b_second_highest_d_e >= e_second_highest_d_e:
+                    be, maxd_be = b_second_highest_e, b_second_highest_d_e
+                else:
+                    ee, maxd_ee = e_second_highest_e, e_second_highest_d_e
+
+        if be is not None:
+            first = be
+            length += 1
+            mask |= 1 << be
+        if ee is not None:
+            last = ee
+            length += 1
+            mask |= 1 << ee
+        # the path store only gets the new path if it becomes mu or is pushed, so it grows with the pushes,
+        # not with the iterations
+        parent, cp = cp, None
+        peak_length = max(peak_length, length)
+
+        if be == ee:
+            ocp = maxd_be + ocp
+        else:
+            ocp = maxd_be + maxd_ee + ocp
+
+        if ocp > omax:
+            cp = ps.extend(parent, -1 if be is None else be, -1 if ee is None else ee)
+            omax, mu = ocp, cp
+            if shared_omax is not None and omax > shared_omax.value:
+                with shared_omax.get_lock():
+                    shared_omax.value = max(shared_omax.value, omax)
+            if on_improve is not None:
+                on_improve(omax, [dn.nodes[n] for n in ps.path(mu)], time() - (time_seeding or time_expansion))
+
+        if ocpub > omax and ocpub > bound and length < k:
+            smaller, bigger = (maxd_be, maxd_ee) if maxd_be < maxd_ee else (maxd_ee, maxd_be)
+
+            if smaller < ld.demands[cur]:
+                ocpub -= (ld.demands[cur] - smaller)
+                cur -= 1
+            if bigger < ld.demands[cur]:
+                ocpub -= (ld.demands[cur] - bigger)
+                cur -= 1
+
+            try:
+                assert ocpub >= ocp
+            except AssertionError as e:
+                print('Ocpub < Ocp:', ocpub, ps.path(parent), be, ee, ocp, cur)
+                raise e
+
+            # domination checking and circle checking
+            if ocp > dt.get(frozenset((be, ee)), 0):
+                dt[frozenset((be, ee))] = ocp
+                if cp is None:
+                    cp = ps.extend(parent, -1 if be is None else be, -1 if ee is None else ee)
+                pq.push(ocpub, cp, ocp, cur, first, last, length, mask)
+                pushes += 1
+                peak_queue = max(peak_queue, len(pq))
+            else:
+                prunes += 1
+
+    METRICS.add_time('expansion', time() - time_expansion)
+    count_search(it, pushes, pops, prunes, peak_queue, peak_length)
+    METRICS.peak('peak path store size', len(ps))
+    optimal = report_beam(pq, max(omax, bound))
+    gap = report_gap(pq, max(omax, bound), top_ub)
+    return omax, [dn.nodes[n] for n in ps.path(mu)], stop, gap, optimal
+
+
+# (tfvrnet, Ld, K, iteration max, queue size limit, warm start, deadline, shared Omax) of the portfolio worker process
+_portfolio = None
+
+
+def init_portfolio_worker(search: tuple, shared_omax) -> None:
+    global _portfolio
+    _portfolio = (*search, shared_omax)
+
+
+def search_part(part: tuple) -> tuple:
+    """
+        input: (index, number) of the seed part
+        return: Omax, path, stop, gap and beam result of the part as eta_array, metrics counters of the search
+    """
+    tfvrnet, ld, k, itmax, max_queue, warm, deadline, shared_omax = _portfolio
+    omax, mu = warm if warm is not None else (ld.demands[0], None)
+    mark = METRICS.mark()
+    result = eta_array(tfvrnet, ld, k, itmax, omax, mu, max_queue, None, part, shared_omax, deadline)
+    return (*result, METRICS.since(mark)['Counters'])
+
+
+def eta_portfolio(
+        tfvrnet: nx.Graph, ld: SortedEdgeScoreList, k: int, itmax: int, max_queue: int, workers: int,
+        time_seeding: float, warm: tuple = None, deadline: float = None) -> tuple:
+    """
+        input: transformed virtual network, Ld, K, iteration max, queue size limit, number of worker processes,
+            start time of seeding for metrics, (objective, path) to warm start every worker with,
+            time() for every worker to stop expanding at
+        return: Omax, found path, None or what stopped the search of its worker, largest gap of the workers,
+            whether the bounded queue of every worker kept every path that could beat its Omax
+
+        seed i of Ld goes to worker i % workers, so every worker starts from some of the best seeds.
+        each worker runs eta_array on its seeds with its own queue and domination table, and breaks and
+        prunes with the best Omax of all workers, which is shared in a multiprocessing Value.
+        every worker may run itmax iterations, like a serial search, and the best mu of the workers is
+        returned, the lowest worker on ties. the gap of every worker is against the best Omax it knew of,
+        which is at most the returned Omax, so the largest of them is an upper bound of the gap.
+
+        a path is only dominated by paths of the same worker, and each worker pops in the order of its
+        own queue, so the result can differ from the serial search even when itmax is not hit.
+        sharing the domination table does not fix that (the order still differs) and makes the result
+        depend on timing, so it is not shared
+    """
+    workers = min(workers, len(ld))
+    shared_omax = Value('d', ld.demands[0] if warm is None else warm[0])
+    # the search only needs the node order of tfvrnet, not the paths on its edges
+    search_net = nx.Graph()
+    search_net.add_nodes_from(tfvrnet.nodes())
+    time_expansion = time()
+    METRICS.add_time('seeding', time_expansion - time_seeding)
+    with Pool(workers, initializer=init_portfolio_worker,
+              initargs=((search_net, ld, k, itmax, max_queue, warm, deadline), shared_omax)) as pool:
+        results = pool.map(search_part, [(p, workers) for p in range(workers)])
+    # wall-clock time, with starting the workers and sending them the search
+    time_expansion = time() - time_expansion
+    METRICS.add_time('expansion', time_expansion)
+
+    best = 0
+    for p, (omax, *_, counters) in enumerate(results):
+        METRICS.add_counters(counters)
+        if omax > results[best][0]:
+            best = p
+    print(f'portfolio search: {workers} workers in {time_expansion:.3f} seconds, '
+          f'Omax of every worker: {[r[0] for r in results]}, '
+          f'iterations: {[r[-1].get("iterations", 0) for r in results]}')
+    omax, mu, stop, _, _, _ = results[best]
+    return omax, mu, stop, max(r[3] for r in results), all(r[4] for r in results)
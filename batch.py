@@ -0,0 +1,161 @@
+"""
+    batch planner: load the virtual and physical worlds once and plan many scenarios over them
+
+    the scenario file has one JSON object per line, with the same fields as a request to server.py:
+    - id: echoed back in the result, default is the line number starting from 1
+    - source: nid of the source, default is the 'Start index' of the mapping file
+    - destinations: list of nid of the destinations, default is the 'Destination index' of the mapping file
+    - alpha, sn, itmax, cost_limit, search_engine, max_queue, phy_search, time_budget: see server.py
+    - continue_from: id of an earlier scenario with the same alpha, update the tfvrnet of its plan instead of
+      building it again (see main.replan) when at most half of the nodes of interest changed
+    - warm_start: default false, with continue_from, also start the search from the path of that plan
+
+    every other scenario is planned cold, so its result does not depend on the order or the worker it runs in.
+    a scenario and the scenarios that continue from it, directly or through others, run in order in one worker.
+    the scenarios run in --batch-workers processes that get the worlds once, at start, and keep their own
+    physical sub-path cache. results are written to --results as one JSON line per scenario, in the order
+    they finish, with the fields of a server response
+
+    usage:
+    python3 batch.py -v vindex_G20.txt -p physical.txt -m G20_tophy.json --scenarios scenarios.jsonl --batch-workers 4
+"""
+import json
+from multiprocessing import Pool
+import os
+from time import time
+
+from main import check_args, make_parser
+from server import init_server_worker, load_world, plan_request
+
+
+def read_scenarios(path: str) -> list:
+    """
+        input: scenario file path
+        return: list of scenario dicts, a line that is not a JSON object or that continues from a scenario
+            not above it becomes a scenario with 'Error'
+    """
+    scenarios = []
+    seen = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                scenario = json.loads(line)
+                if not isinstance(scenario, dict):
+                    raise ValueError('scenario should be a JSON object')
+            except ValueError as e:
+                scenario = {'Error': repr(e)}
+            scenario.setdefault('id', line_number)
+            if 'continue_from' in scenario and scenario['continue_from'] not in seen:
+                scenario['Error'] = f'continue_from {scenario["continue_from"]} is not the id of a scenario above it'
+            seen.add(scenario['id'])
+            scenarios.append(scenario)
+    return scenarios
+
+
+def make_chains(scenarios: list) -> list:
+    """
+        input: list of scenario dicts from read_scenarios
+        return: list of chains, a chain is a scenario and all scenarios that continue from it, in file order
+    """
+    chains = dict()
+    # id -> id of the first scenario of its chain, the first scenario with an id wins like in run_chain
+    roots = dict()
+    for scenario in scenarios:
+        root = scenario['id']
+        if 'continue_from' in scenario and 'Error' not in scenario:
+            root = roots[scenario['continue_from']]
+        roots.setdefault(scenario['id'], root)
+        chains.setdefault(root, []).append(scenario)
+    return list(chains.values())
+
+
+def run_chain(chain: list) -> list:
+    """
+        input: chain of scenario dicts
+        return: list of result dicts of the scenarios with their id and the seconds each took
+    """
+    # id -> (alpha field, tfvrnet, tfvrpath) of the scenarios of this chain that found a path
+    plans = dict()
+    results = []
+    for scenario in chain:
+        time_begin = time()
+        alpha = scenario.get('alpha')
+        last = None
+        if 'continue_from' in scenario and 'Error' not in scenario:
+            last = plans.get(scenario['continue_from'])
+            if last is None:
+                scenario = {**scenario, 'Error': f'scenario {scenario["continue_from"]} has no plan to continue from'}
+            elif last[0] != alpha:
+                scenario = {**scenario, 'Error': f'scenario {scenario["continue_from"]} has another alpha'}
+        if 'Error' in scenario:
+            result = {'Error': scenario['Error']}
+        else:
+            try:
+                result, tfvrnet, tfvrpath = plan_request(scenario, last[1:] if last else None)
+                if tfvrpath is not None:
+                    plans.setdefault(scenario['id'], (alpha, tfvrnet, tfvrpath))
+            except Exception as e:
+                result = {'Error': repr(e)}
+        results.append({'id': scenario['id'], **result, 'Seconds': time() - time_begin})
+    return results
+
+
+if __name__ == '__main__':
+    parser = make_parser()
+    parser.add_argument('--scenarios',
+                        dest='scenarios_filepath',
+                        type=str,
+                        required=True,
+                        help='JSONL file of scenarios, one JSON object of source and destinations per line'
+                        )
+    parser.add_argument('--results',
+                        dest='results_filepath',
+                        type=str,
+                        default='output/batch_results.jsonl',
+                        help='JSONL file the results are streamed to'
+                        )
+    parser.add_argument('--batch-workers',
+                        dest='batch_workers',
+                        type=int,
+                        default=1,
+                        help='number of processes that run scenarios'
+                        )
+    args = parser.parse_args()
+    check_args(parser, args, single_alpha=True)
+
+    scenarios = read_scenarios(args.scenarios_filepath)
+    chains = make_chains(scenarios)
+    print(f'{len(scenarios)} scenarios in {len(chains)} chains from {args.scenarios_filepath}')
+
+    time_begin = time()
+    world = load_world(args)
+    print(f'read and make nets: {time()-time_begin} seconds')
+
+    if os.path.dirname(args.results_filepath):
+        os.makedirs(os.path.dirname(args.results_filepath), exist_ok=True)
+    pool = None
+    if args.batch_workers > 1:
+        # the worlds are sent to every worker once, then only scenarios and results cross processes
+        pool = Pool(min(args.batch_workers, max(len(chains), 1)), initializer=init_server_worker, initargs=(world,))
+        chain_results = pool.imap_unordered(run_chain, chains)
+    else:
+        init_server_worker(world)
+        chain_results = map(run_chain, chains)
+
+    errors = 0
+    time_begin = time()
+    with open(args.results_filepath, 'w+', encoding='utf-8') as results_file:
+        for results in chain_results:
+            for result in results:
+                errors += 'Error' in result
+                results_file.write(json.dumps(result) + '\n')
+            # flushed so a reader can follow the results while the batch runs
+            results_file.flush()
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    print(f'{len(scenarios)} scenarios, {errors} errors, in {time()-time_begin} seconds')
+    print(f'results are written to {args.results_filepath}')
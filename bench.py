@@ -0,0 +1,277 @@
+"""
+    benchmark of the planning phases on synthetic worlds
+
+    for every combination of the world parameters, a world is generated with gen_world.py (kept in --world-dir
+    and reused by later runs), then the phases are run in this process:
+    - parse vrnet: nets.get_vrnet
+    - parse phnet: nets.get_phnet
+    - tfvrnet: nets.make_tfvrnet
+    - find tfvrpath: algo.find_tfvrpath
+    - get paths: main.get_paths
+    every phase is timed --repeat times and the fastest is reported. peak memory is measured in one extra run
+    with tracemalloc, as the peak of memory allocated by python during the phase, because tracemalloc slows
+    the timed runs down
+
+    the report is written as {output}.json and a markdown table {output}.md. with --compare OLD.json the
+    ratio new / old of every phase is added to the table, for worlds that are in both reports
+
+    usage:
+    python3 bench.py --nodes 1000 4000 --destinations 10 30 --grid 100 -o output/bench
+    python3 bench.py --nodes 1000 4000 --destinations 10 30 --grid 100 -o output/bench_new --compare output/bench.json
+"""
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from itertools import product
+import json
+import os
+import platform
+import subprocess
+import sys
+from time import perf_counter
+import tracemalloc
+import networkx as nx
+import numpy as np
+
+from algo import find_tfvrpath
+from gen_world import world_paths, write_world
+from main import get_paths
+from metrics import METRICS
+from nets import get_phnet, get_vrnet, make_tfvrnet
+
+PHASES = ['parse vrnet', 'parse phnet', 'tfvrnet', 'find tfvrpath', 'get paths']
+
+
+def world_name(world: dict) -> str:
+    return 'n{nodes}_k{neighbors}_d{destinations}_g{grid}_o{obstacle_ratio}_s{seed}'.format(**world)
+
+
+def run_phases(paths: tuple, args, memory: bool = False) -> tuple:
+    """
+        input: virtual, physical and mapping file paths, arguments, whether to trace memory instead of timing
+        return: dict of phase -> seconds or peak bytes, result dict of the run
+    """
+    virtual_path, physical_path, mapping_path = paths
+    measures = dict()
+    outputs = dict()
+    phase_calls = [
+        ('parse vrnet', lambda: get_vrnet(virtual_path, mapping_path)),
+        ('parse phnet', lambda: get_phnet(physical_path)),
+        ('tfvrnet', lambda: make_tfvrnet(
+            outputs['parse vrnet'][0], outputs['parse vrnet'][1], outputs['parse vrnet'][2], args.alpha,
+            args.tfvrnet_engine)),
+        ('find tfvrpath', lambda: find_tfvrpath(outputs['tfvrnet'], args.sn, args.vritmax, args.search_engine)),
+        ('get paths', lambda: get_paths(
+            outputs['tfvrnet'], outputs['parse vrnet'][0], outputs['parse phnet'][0], outputs['find tfvrpath'],
+            outputs['parse vrnet'][1], args.phsearch))
+    ]
+    mark = METRICS.mark()
+    for phase, call in phase_calls:
+        if memory:
+            tracemalloc.start()
+            outputs[phase] = call()
+            measures[phase] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            time_begin = perf_counter()
+            outputs[phase] = call()
+            measures[phase] = perf_counter() - time_begin
+
+    vrnet = outputs['parse vrnet'][0]
+    result = {
+        'Virtual nodes': vrnet.number_of_nodes(),
+        'Virtual edges': vrnet.number_of_edges(),
+        'Total cost': outputs['get paths'][3],
+        'Total length': outputs['get paths'][4],
+        'Counters': METRICS.since(mark)['Counters']
+    }
+    return measures, result
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'Commit': commit,
+        'Python': sys.version.split()[0],
+        'networkx': nx.__version__,
+        'numpy': np.__version__,
+        'Platform': platform.platform(),
+        'CPUs': os.cpu_count()
+    }
+
+
+def markdown_report(report: dict, old_report: dict = None) -> str:
+    """
+        input: report dict, earlier report dict to compare with
+        return: markdown text
+    """
+    old_results = {world_name(r['World']): r for r in old_report['Results']} if old_report else dict()
+    lines = [
+        f"commit: {report['Environment']['Commit']}, python {report['Environment']['Python']}, "
+        f"{report['Environment']['Platform']}, {report['Environment']['CPUs']} cpus",
+        '',
+        '| world | nodes | edges | ' + ' | '.join(f'{p} (s)' for p in PHASES) + ' | '
+        + ' | '.join(f'{p} (MB)' for p in PHASES) + ' | iterations |',
+        '|' + ' --- |' * (4 + 2 * len(PHASES))
+    ]
+    for r in report['Results']:
+        name = world_name(r['World'])
+        old = old_results.get(name)
+        seconds = []
+        for p in PHASES:
+            cell = f"{r['Seconds'][p]:.4f}"
+            if old:
+                cell += f" ({r['Seconds'][p] / max(old['Seconds'][p], 1e-9):.2f}x)"
+            seconds.append(cell)
+        mbs = [f"{r['Peak bytes'][p] / 2**20:.1f}" if r.get('Peak bytes') else '-' for p in PHASES]
+        lines.append(
+            f"| {name} | {r['Virtual nodes']} | {r['Virtual edges']} | " + ' | '.join(seconds + mbs)
+            + f" | {r['Counters'].get('iterations', 0)} |")
+    if old_report:
+        lines += ['', f"(Nx) is the time of this run / the time of commit {old_report['Environment']['Commit']}"]
+    return '\n'.join(lines) + '\n'
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('--nodes',
+                        dest='nodes',
+                        type=int,
+                        nargs='+',
+                        default=[1000, 4000]
+                        )
+    parser.add_argument('--neighbors',
+                        dest='neighbors',
+                        type=int,
+                        nargs='+',
+                        default=[3]
+                        )
+    parser.add_argument('--destinations',
+                        dest='destinations',
+                        type=int,
+                        nargs='+',
+                        default=[10, 30]
+                        )
+    parser.add_argument('--grid',
+                        dest='grid',
+                        type=int,
+                        nargs='+',
+                        default=[100],
+                        help='side of the square physical grid'
+                        )
+    parser.add_argument('--obstacle-ratio',
+                        dest='obstacle_ratio',
+                        type=float,
+                        nargs='+',
+                        default=[0.15]
+                        )
+    parser.add_argument('--seed',
+                        dest='seed',
+                        type=int,
+                        nargs='+',
+                        default=[0]
+                        )
+    parser.add_argument('--alpha', '-a',
+                        dest='alpha',
+                        type=float,
+                        default=1.0
+                        )
+    parser.add_argument('--seeding-number', '--sn',
+                        dest='sn',
+                        type=int,
+                        default=5000
+                        )
+    parser.add_argument('--vr-iteration-max', '--vritmax',
+                        dest='vritmax',
+                        type=int,
+                        default=1000000
+                        )
+    parser.add_argument('--search-engine',
+                        dest='search_engine',
+                        type=str,
+                        choices=['dict', 'array'],
+                        default='dict'
+                        )
+    parser.add_argument('--tfvrnet-engine',
+                        dest='tfvrnet_engine',
+                        type=str,
+                        choices=['dijkstra', 'pairwise', 'oracle', 'csgraph'],
+                        default='dijkstra'
+                        )
+    parser.add_argument('--phy-search',
+                        dest='phsearch',
+                        type=str,
+                        choices=['queen', 'astar'],
+                        default='queen'
+                        )
+    parser.add_argument('--repeat',
+                        dest='repeat',
+                        type=int,
+                        default=3
+                        )
+    parser.add_argument('--no-memory',
+                        dest='memory',
+                        action='store_false',
+                        help='skip the tracemalloc run'
+                        )
+    parser.add_argument('--world-dir',
+                        dest='world_dir',
+                        type=str,
+                        default='data/bench'
+                        )
+    parser.add_argument('--output-filepath', '-o',
+                        dest='output',
+                        type=str,
+                        default='output/bench'
+                        )
+    parser.add_argument('--compare',
+                        dest='compare',
+                        type=str,
+                        help='earlier report json to compare with'
+                        )
+    args = parser.parse_args()
+
+    os.makedirs(args.world_dir, exist_ok=True)
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    old_report = json.load(open(args.compare, encoding='utf8')) if args.compare else None
+
+    report = {
+        'Environment': environment(),
+        'Parameters': {
+            k: getattr(args, k) for k in ('alpha', 'sn', 'vritmax', 'search_engine', 'tfvrnet_engine', 'phsearch', 'repeat')
+        },
+        'Results': []
+    }
+    worlds = [
+        dict(zip(('nodes', 'neighbors', 'destinations', 'grid', 'obstacle_ratio', 'seed'), values))
+        for values in product(args.nodes, args.neighbors, args.destinations, args.grid, args.obstacle_ratio, args.seed)
+    ]
+    for world in worlds:
+        name = world_name(world)
+        prefix = os.path.join(args.world_dir, name)
+        paths = world_paths(prefix)
+        if not all(os.path.exists(p) for p in paths):
+            write_world(
+                prefix, world['nodes'], world['neighbors'], world['destinations'], world['grid'], world['grid'],
+                world['obstacle_ratio'], seed=world['seed'])
+
+        # the phases print their progress, which is not what this script reports
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            runs = [run_phases(paths, args) for _ in range(args.repeat)]
+            peaks = run_phases(paths, args, memory=True)[0] if args.memory else None
+        result = {'World': world, **runs[0][1]}
+        result['Seconds'] = {p: min(seconds[p] for seconds, _ in runs) for p in PHASES}
+        result['Peak bytes'] = peaks
+        report['Results'].append(result)
+        print(f'{name}: ' + ', '.join(f"{p}: {result['Seconds'][p]:.4f}s" for p in PHASES))
+
+    json.dump(report, open(f'{args.output}.json', 'w+', encoding='utf8'), indent=2)
+    markdown = markdown_report(report, old_report)
+    open(f'{args.output}.md', 'w+', encoding='utf8').write(markdown)
+    print(markdown)
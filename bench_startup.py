@@ -0,0 +1,61 @@
+"""
+    start-up benchmark of main.py
+
+    runs main.py several times as a fresh process and measures the wall time from process start to
+    - the first printed line, which is interpreter start-up plus imports
+    - the 'read and make nets' line, which is when planning can start
+    - the end of the process
+    a bare `python -c pass` is measured too as the floor of interpreter start-up
+
+    all arguments except --repeat are passed to main.py, for example:
+    python3 bench_startup.py --repeat 10 -v vindex_G20.txt -p physical.txt -m G20_tophy.json
+"""
+from argparse import ArgumentParser
+import os
+from statistics import median
+import subprocess
+import sys
+from time import perf_counter
+
+MAIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+
+
+def time_run(cmd: list, markers: list) -> dict:
+    """
+        input: command, line prefixes to time
+        return: dict of marker -> seconds from start until the first line with that prefix, plus 'exit'
+    """
+    times = dict()
+    begin = perf_counter()
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True) as p:
+        for line in p.stdout:
+            now = perf_counter() - begin
+            times.setdefault('first line', now)
+            for m in markers:
+                if line.startswith(m):
+                    times.setdefault(m, now)
+    times['exit'] = perf_counter() - begin
+    if p.returncode != 0:
+        raise RuntimeError(f'{" ".join(cmd)} exited with {p.returncode}')
+    return times
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('--repeat',
+                        dest='repeat',
+                        type=int,
+                        default=5
+                        )
+    args, main_args = parser.parse_known_args()
+
+    floor = [time_run([sys.executable, '-c', 'pass'], [])['exit'] for _ in range(args.repeat)]
+    markers = ['read and make nets']
+    runs = [time_run([sys.executable, '-u', MAIN_PATH, *main_args], markers) for _ in range(args.repeat)]
+
+    print(f'{"stage":<24}{"min":>10}{"median":>10}  seconds over {args.repeat} runs')
+    print(f'{"python -c pass":<24}{min(floor):>10.3f}{median(floor):>10.3f}')
+    for stage in ['first line', *markers, 'exit']:
+        ts = [r[stage] for r in runs if stage in r]
+        if ts:
+            print(f'{stage:<24}{min(ts):>10.3f}{median(ts):>10.3f}')
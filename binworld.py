@@ -0,0 +1,132 @@
+"""
+    columnar binary world format: a directory of .npy arrays plus a small header
+
+    header.json         {"version", "length", "width", "source"}
+    node_xy.npy         (N, 2) int64, virtual node coordinates, row i is the node with nid i
+    node_phy.npy        (N, 2) int64, physical grid of every node
+    node_has_phy.npy    (N,) bool, False if the node has no physical position
+    edges.npy           (E, 2) int64, nid pairs in the order of the virtual world file
+    edge_length.npy     (E,) float64, NaN if the mapping file has no length for the edge
+    edge_cost.npy       (E,) float64, NaN if the mapping file has no cost for the edge
+    obstacle.npy        (length, width) bool, True on obstacles
+    destinations.npy    (D,) int64, nid of the destinations
+
+    arrays are loaded with mmap_mode='r', so startup does not parse anything and
+    many planner processes on one machine share the same pages of a world
+
+    convert with:
+    python3 binworld.py -v vindex_G20.txt -p physical.txt -m G20_tophy.json -o G20_world
+"""
+from argparse import ArgumentParser
+import json
+import os
+import networkx as nx
+import numpy as np
+
+BINWORLD_VERSION = 1
+
+
+def save_world(
+        out_dir: str, vrnet: nx.Graph, node_list: list, edge_list: list, tophy: dict,
+        obs: set, length: int, width: int) -> None:
+    """
+        input: output directory, outputs of nets.read_vrnet, obstacles, length and width of the physical world
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    nid = {n: i for i, n in enumerate(node_list)}
+    phy = [vrnet.nodes[n]['phy'] for n in node_list]
+    arrays = {
+        'node_xy': np.array(node_list, dtype=np.int64).reshape(-1, 2),
+        'node_phy': np.array([p if p is not None else (-1, -1) for p in phy], dtype=np.int64).reshape(-1, 2),
+        'node_has_phy': np.array([p is not None for p in phy], dtype=bool),
+        'edges': np.array([(nid[u], nid[v]) for u, v in edge_list], dtype=np.int64).reshape(-1, 2),
+        'edge_length': np.array([vrnet.edges[e].get('length', np.nan) for e in edge_list], dtype=np.float64),
+        'edge_cost': np.array([vrnet.edges[e].get('cost', np.nan) for e in edge_list], dtype=np.float64),
+        'obstacle': np.zeros((length, width), dtype=bool),
+        'destinations': np.array(list(tophy['Destination index'].values()), dtype=np.int64),
+    }
+    for x, y in obs:
+        if 0 <= x < length and 0 <= y < width:
+            arrays['obstacle'][x, y] = True
+    for name, a in arrays.items():
+        np.save(os.path.join(out_dir, f'{name}.npy'), a)
+    header = {'version': BINWORLD_VERSION, 'length': length, 'width': width, 'source': tophy['Start index']}
+    json.dump(header, open(os.path.join(out_dir, 'header.json'), 'w+', encoding='utf8'))
+
+
+def _load(world_dir: str, name: str) -> np.ndarray:
+    return np.load(os.path.join(world_dir, f'{name}.npy'), mmap_mode='r')
+
+
+def load_header(world_dir: str) -> dict:
+    header = json.load(open(os.path.join(world_dir, 'header.json'), 'r', encoding='utf8'))
+    assert header['version'] == BINWORLD_VERSION, f'unsupported binary world version {header["version"]}'
+    return header
+
+
+def load_obstacle(world_dir: str) -> np.ndarray:
+    load_header(world_dir)
+    return _load(world_dir, 'obstacle')
+
+
+def load_vrnet(world_dir: str) -> tuple:
+    """
+        input: binary world directory
+        return: full virtual network, node list, mapping fields like nets.read_vrnet
+    """
+    header = load_header(world_dir)
+    node_list = list(map(tuple, _load(world_dir, 'node_xy').tolist()))
+    phy = _load(world_dir, 'node_phy').tolist()
+    has_phy = _load(world_dir, 'node_has_phy').tolist()
+    vrnet = nx.Graph()
+    vrnet.add_nodes_from(
+        (n, {'nid': i, 'phy': tuple(phy[i]) if has_phy[i] else None})
+        for i, n in enumerate(node_list)
+    )
+    lengths = _load(world_dir, 'edge_length').tolist()
+    costs = _load(world_dir, 'edge_cost').tolist()
+    for (u, v), length, cost in zip(_load(world_dir, 'edges').tolist(), lengths, costs):
+        attr = {}
+        # NaN != NaN, so this skips the attributes that the mapping file did not have
+        if length == length:
+            attr['length'] = length
+        if cost == cost:
+            attr['cost'] = cost
+        vrnet.add_edge(node_list[u], node_list[v], **attr)
+    tophy = {
+        'Start index': header['source'],
+        'Destination index': {str(i): d for i, d in enumerate(_load(world_dir, 'destinations').tolist())}
+    }
+    return vrnet, node_list, tophy
+
+
+if __name__ == '__main__':
+    from nets import read_phy, read_vrnet
+
+    parser = ArgumentParser(description='convert text worlds into a binary world directory')
+    parser.add_argument('--virtual-world-file', '-v',
+                        dest='virtual_filepath',
+                        required=True,
+                        type=str
+                        )
+    parser.add_argument('--physical-world-file', '-p',
+                        dest='physical_filepath',
+                        required=True,
+                        type=str
+                        )
+    parser.add_argument('--virtual-physical-mapping-file', '-m',
+                        dest='vp_mapping_filepath',
+                        required=True,
+                        type=str
+                        )
+    parser.add_argument('--output-dir', '-o',
+                        dest='output',
+                        required=True,
+                        type=str
+                        )
+    args = parser.parse_args()
+
+    vrnet, node_list, edge_list, tophy = read_vrnet(args.virtual_filepath, args.vp_mapping_filepath)
+    obs, length, width = read_phy(args.physical_filepath)
+    save_world(args.output, vrnet, node_list, edge_list, tophy, obs, length, width)
+    print(f'binary world written to {args.output}')
@@ -0,0 +1,180 @@
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+from time import time
+
+# bump when the layout of cached networks changes so old entries are not used
+CACHE_VERSION = 1
+# a temp file this old is left by a crashed writer, not one still writing
+STALE_TMP_SECONDS = 3600
+
+
+def file_digest(path: str) -> str:
+    # a directory, like a binary world, is hashed over all of its files in name order
+    paths = [path]
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    h = hashlib.sha256()
+    for p in paths:
+        h.update(os.path.basename(p).encode() + b'\0')
+        with open(p, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+class NetCache():
+    """
+        on-disk cache of built networks, one pickle file per entry in cache_dir
+
+        entries are keyed by content hashes of the input files (plus alpha and engine for the
+        transformed virtual network), so changing any input changes the key and stale
+        entries are never read. when the directory grows over max_bytes, the least
+        recently used entries are deleted
+
+        several processes of a sweep can share the directory, so an entry can be deleted by another
+        process at any time, which is the same as a miss
+    """
+    def __init__(self, cache_dir: str, max_bytes: int) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(*parts) -> str:
+        h = hashlib.sha256(f'v{CACHE_VERSION}'.encode())
+        for p in parts:
+            h.update(b'\0' + str(p).encode())
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+
+    def load(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                obj = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # written by an incompatible version or truncated, just rebuild it
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        # mtime is the last use time for eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return obj
+
+    def store(self, key: str, obj) -> None:
+        path = self._path(key)
+        # write to a temp file first so a crash never leaves a half-written entry
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+                if name.endswith('.tmp'):
+                    # left by a writer that crashed before os.replace
+                    if st.st_mtime < time() - STALE_TMP_SECONDS:
+                        os.remove(path)
+                elif name.endswith('.pkl'):
+                    entries.append((st.st_mtime, st.st_size, name))
+            except FileNotFoundError:
+                # deleted by another process meanwhile
+                continue
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class PathCache():
+    """
+        in-memory cache of physical sub-paths between two grids, the least recently used are dropped
+        beyond maxlen entries
+
+        a path is stored once under (u, v) with u <= v and reversed when (v, u) is asked,
+        which is right because the physical network is undirected. every cached path must come from
+        the same physical network and the same search method
+    """
+    def __init__(self, maxlen: int) -> None:
+        self.maxlen = maxlen
+        self.paths = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, u, v, search) -> list:
+        """
+            input: start grid, end grid, function (u, v) -> path, called on a miss
+            return: path from u to v, the caller must not change it
+        """
+        key = (u, v) if u <= v else (v, u)
+        path = self.paths.get(key)
+        if path is None:
+            self.misses += 1
+            path = search(*key)
+            if self.maxlen > 0:
+                self.paths[key] = path
+                if len(self.paths) > self.maxlen:
+                    self.paths.popitem(last=False)
+                    self.evictions += 1
+        else:
+            self.hits += 1
+            self.paths.move_to_end(key)
+        return path if key[0] == u else path[::-1]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'Entries': len(self.paths),
+            'Hits': self.hits,
+            'Misses': self.misses,
+            'Evictions': self.evictions,
+            'Hit ratio': self.hits / lookups if lookups else 0
+        }
+
+
+class VrnetMemo():
+    """
+        in-memory memo of things built from a vrnet, like its CSR form or distance oracle, per vrnet object
+
+        entries are keyed by id(vrnet) and hold vrnet itself, so its id is not reused while the entry lives.
+        only the latest maxlen are kept: a batch or server process keeps one world, but an alpha sweep
+        makes a new entry for every alpha
+    """
+    def __init__(self, maxlen: int = 4) -> None:
+        self.maxlen = maxlen
+        self.entries = dict()
+
+    def get(self, vrnet, build, *key):
+        """
+            input: vrnet, function () -> value, called if there is no entry yet, more key than vrnet like alpha
+            return: value of the entry of (vrnet, *key)
+        """
+        memo_key = (id(vrnet), *key)
+        if memo_key not in self.entries:
+            value = build()
+            if len(self.entries) >= self.maxlen:
+                del self.entries[next(iter(self.entries))]
+            self.entries[memo_key] = (vrnet, value)
+        return self.entries[memo_key][1]
@@ -0,0 +1,144 @@
+"""
+    compressed sparse row form of the virtual network
+
+    nodes are integers 0..N-1, node i is node_list[i], and its neighbors are indices[indptr[i]:indptr[i+1]],
+    sorted, with the length, cost and weight of every edge at the same positions. every undirected edge
+    is stored in both directions. this is about 70 bytes per undirected edge with weights, against
+    several hundred for the dict of dicts of an nx.Graph, and the attributes of many edges, like all
+    edges of a path, are read with one searchsorted and one array index
+
+    shortest paths between nodes of interest run in scipy.sparse.csgraph when scipy is installed
+"""
+import networkx as nx
+import numpy as np
+
+from cache import VrnetMemo
+
+
+def vrnet_arrays(vrnet: nx.Graph, attrs: tuple = ('weight',)) -> tuple:
+    """
+        input: virtual network, edge attributes to read
+        return: node list, indptr, indices, one array per attribute
+
+        compact CSR form of the adjacency, node i is node_list[i] and its neighbors are
+        indices[indptr[i]:indptr[i+1]] in the order of vrnet.adj, with the attributes at the same positions
+    """
+    node_list = list(vrnet.nodes())
+    node_index = {n: i for i, n in enumerate(node_list)}
+    indptr = np.zeros(len(node_list) + 1, dtype=np.int64)
+    indices = np.empty(2 * vrnet.number_of_edges(), dtype=np.int64)
+    values = [np.empty(2 * vrnet.number_of_edges(), dtype=np.float64) for _ in attrs]
+    p = 0
+    for i, (u, nbrs) in enumerate(vrnet.adj.items()):
+        for v, attr in nbrs.items():
+            indices[p] = node_index[v]
+            for a, array in zip(attrs, values):
+                array[p] = attr[a]
+            p += 1
+        indptr[i+1] = p
+    return (node_list, indptr, indices, *values)
+
+
+class CSRGraph():
+    """
+        node_list: (N,) vrnet node of every integer node
+        node_index: vrnet node -> integer node
+        indptr: (N+1,) neighbors of node i are at [indptr[i], indptr[i+1])
+        indices: (2E,) neighbor of every stored edge, increasing within a row
+        keys: (2E,) u * N + v of every stored edge (u, v), increasing, to find many edges with one searchsorted
+        length, cost, weight: (2E,) attributes of every stored edge
+    """
+    def __init__(self, node_list: list, indptr, indices, length, cost) -> None:
+        self.node_list = node_list
+        self.node_index = {n: i for i, n in enumerate(node_list)}
+        self.indptr = indptr
+        self.indices = indices
+        rows = np.repeat(np.arange(len(node_list), dtype=np.int64), np.diff(indptr))
+        self.keys = rows * len(node_list) + indices
+        self.length = length
+        self.cost = cost
+        self.weight = None
+        self.alpha = None
+
+    @classmethod
+    def from_vrnet(cls, vrnet: nx.Graph) -> 'CSRGraph':
+        """
+            input: virtual network with edge length and cost
+            return: CSR form of it, nodes are in the order of vrnet.nodes()
+        """
+        node_list, indptr, indices, length, cost = vrnet_arrays(vrnet, ('length', 'cost'))
+        # vrnet_arrays keeps the adjacency order, every row is sorted here
+        rows = np.repeat(np.arange(len(node_list), dtype=np.int64), np.diff(indptr))
+        order = np.lexsort((indices, rows))
+        return cls(node_list, indptr, indices[order].astype(np.int32), length[order], cost[order])
+
+    def set_weight(self, alpha: float) -> None:
+        # same formula as nets.set_vrnet_weight, for all edges at once
+        if alpha != self.alpha:
+            self.weight = alpha * self.length + (1 - alpha) * self.cost
+            self.alpha = alpha
+
+    def edge_positions(self, us, vs) -> np.ndarray:
+        """
+            input: integer nodes u and v of some edges
+            return: positions of the edges (u, v) in indices and the attribute arrays
+            raise: KeyError if one of them is not an edge
+        """
+        keys = np.asarray(us, dtype=np.int64) * len(self.node_list) + np.asarray(vs, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        missing = np.flatnonzero(self.keys[positions] != keys)
+        if len(missing):
+            i = missing[0]
+            raise KeyError((self.node_list[us[i]], self.node_list[vs[i]]))
+        return positions
+
+    def path_totals(self, path: list) -> tuple:
+        """
+            input: path as vrnet nodes
+            return: total cost, total length of its edges
+
+            summed in path order like get_paths does on vrnet, numpy's pairwise sum rounds differently
+        """
+        nodes = [self.node_index[n] for n in path]
+        positions = self.edge_positions(nodes[:-1], nodes[1:])
+        return sum(self.cost[positions].tolist()), sum(self.length[positions].tolist())
+
+    def shortest_paths(self, tasks: list, block: int = 64) -> dict:
+        """
+            input: list of (source, target list) as integer nodes, number of sources per scipy call
+            return: dict of (source, target) -> (path as integer nodes from source to target, weight)
+                for every connected pair
+
+            one csgraph dijkstra from every source, in blocks so the predecessor matrix is at most block x N
+        """
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import dijkstra
+        n = len(self.node_list)
+        # explicit zero weights are kept as edges by csr_matrix
+        matrix = csr_matrix((self.weight, self.indices, self.indptr), shape=(n, n))
+        found = dict()
+        for begin in range(0, len(tasks), block):
+            block_tasks = tasks[begin:begin + block]
+            dist, pred = dijkstra(
+                matrix, directed=True, indices=[s for s, _ in block_tasks], return_predecessors=True)
+            for r, (s, targets) in enumerate(block_tasks):
+                for t in targets:
+                    if not np.isfinite(dist[r, t]):
+                        continue
+                    path = [t]
+                    while path[-1] != s:
+                        path.append(int(pred[r, path[-1]]))
+                    found[s, t] = (path[::-1], float(dist[r, t]))
+        return found
+
+
+# CSR graphs of the vrnets of this process
+_csr_graphs = VrnetMemo()
+
+
+def get_csr(vrnet: nx.Graph) -> CSRGraph:
+    """
+        input: virtual network
+        return: CSR form of it, converted once per vrnet of this process
+    """
+    return _csr_graphs.get(vrnet, lambda: CSRGraph.from_vrnet(vrnet))
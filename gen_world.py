@@ -0,0 +1,196 @@
+"""
+    synthetic world generator
+
+    writes a virtual world file, a virtual-physical mapping json and a physical world file
+    in the formats read by nets.get_vrnet and nets.get_phnet
+
+    - virtual nodes are distinct random points in a virtual_size x virtual_size square
+    - every node is linked to the nearest node generated before it, so the virtual network is connected,
+      and to its `neighbors` nearest nodes, which sets the edge density
+    - every node is mapped to a random free grid, as x = 5 * grid_x + r, 0 <= r < 5
+    - edge length is the euclidean distance of the two nodes, edge cost is the queen distance of
+      their physical grids times a random factor in [1, 2)
+    - node 0 is the source and `destinations` other nodes are the destinations
+
+    the same arguments and seed give the same files
+
+    usage:
+    python3 gen_world.py -o data/syn --nodes 2000 --neighbors 3 --destinations 30 --grid 200 --obstacle-ratio 0.2
+"""
+from argparse import ArgumentParser
+import json
+import numpy as np
+
+
+def world_paths(prefix: str) -> tuple:
+    """
+        input: output path prefix
+        return: virtual world file path, physical world file path, mapping file path
+    """
+    return f'{prefix}_virtual.txt', f'{prefix}_physical.txt', f'{prefix}_tophy.json'
+
+
+def nearest_edges(points: np.ndarray, neighbors: int, block: int = 256) -> set:
+    """
+        input: n x 2 points, number of nearest neighbors
+        return: set of (i, j) edges with i < j
+
+        distances are computed in blocks of rows, so memory is O(block * n)
+    """
+    n = len(points)
+    x, y = points[:, 0].astype(float), points[:, 1].astype(float)
+    edges = set()
+    for begin in range(0, n, block):
+        rows = np.arange(begin, min(begin + block, n))
+        dist = (x[rows, None] - x[None, :]) ** 2 + (y[rows, None] - y[None, :]) ** 2
+        dist[rows - begin, rows] = np.inf
+        for r, i in enumerate(rows.tolist()):
+            # nearest node generated before this one, to keep the network connected
+            if i > 0:
+                edges.add((int(np.argmin(dist[r, :i])), i))
+        if neighbors > 0:
+            k = min(neighbors, n - 1)
+            nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+            for i, js in zip(rows.tolist(), nearest.tolist()):
+                for j in js:
+                    edges.add((min(i, j), max(i, j)))
+    return edges
+
+
+def make_world(
+        nodes: int, neighbors: int, destinations: int, length: int, width: int, obstacle_ratio: float,
+        virtual_size: int = 10000, seed: int = 0) -> tuple:
+    """
+        input: number of virtual nodes, nearest neighbors per node, number of destinations,
+            physical grid length and width, ratio of obstacle grids, side of the virtual square, random seed
+        return: node points, edges, node grids, edge costs, obstacles, destination indices
+    """
+    assert 0 < destinations < nodes <= virtual_size ** 2
+    assert 0 <= obstacle_ratio < 1
+    rng = np.random.default_rng(seed)
+
+    # distinct points, drawn by index in the virtual square
+    flat = rng.choice(virtual_size ** 2, size=nodes, replace=False)
+    points = np.stack((flat // virtual_size, flat % virtual_size), axis=1)
+    edges = sorted(nearest_edges(points, neighbors))
+
+    grids = length * width
+    obstacle_flat = rng.choice(grids, size=int(grids * obstacle_ratio), replace=False)
+    is_free = np.ones(grids, dtype=bool)
+    is_free[obstacle_flat] = False
+    free = np.flatnonzero(is_free)
+    node_grid_flat = free[rng.integers(len(free), size=nodes)]
+    node_grids = np.stack((node_grid_flat // width, node_grid_flat % width), axis=1)
+
+    e = np.array(edges)
+    queen_dist = np.abs(node_grids[e[:, 0]] - node_grids[e[:, 1]]).max(axis=1)
+    costs = queen_dist * rng.uniform(1, 2, size=len(edges))
+    obstacles = np.stack((obstacle_flat // width, obstacle_flat % width), axis=1)
+    dests = rng.choice(np.arange(1, nodes), size=destinations, replace=False)
+    return points, edges, node_grids, costs, obstacles, dests
+
+
+def write_world(
+        prefix: str, nodes: int, neighbors: int, destinations: int, length: int, width: int, obstacle_ratio: float,
+        virtual_size: int = 10000, seed: int = 0) -> tuple:
+    """
+        input: output path prefix, then the same as make_world
+        return: virtual world file path, physical world file path, mapping file path
+    """
+    points, edges, node_grids, costs, obstacles, dests = make_world(
+        nodes, neighbors, destinations, length, width, obstacle_ratio, virtual_size, seed)
+    rng = np.random.default_rng(seed + 1)
+    virtual_path, physical_path, mapping_path = world_paths(prefix)
+
+    # node ids of the mapping file are in order of first appearance in the virtual world file
+    nid = dict()
+    with open(virtual_path, 'w', encoding='utf-8') as f:
+        f.write('virtual world\n')
+        for i, j in edges:
+            f.write(f'---\n{points[i][0]} {points[i][1]}\n{points[j][0]} {points[j][1]}\n')
+            nid.setdefault(i, len(nid))
+            nid.setdefault(j, len(nid))
+
+    offsets = rng.integers(5, size=(nodes, 2))
+    positions = {
+        str(nid[i]): {'x': int(node_grids[i][0] * 5 + offsets[i][0]), 'y': int(node_grids[i][1] * 5 + offsets[i][1])}
+        for i in sorted(nid, key=nid.get)
+    }
+    edge_objs = {
+        str(n): {
+            'left': nid[i],
+            'right': nid[j],
+            'length': float(np.hypot(*(points[i] - points[j]))),
+            'cost': float(c)
+        }
+        for n, ((i, j), c) in enumerate(zip(edges, costs))
+    }
+    with open(mapping_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'Number of vertex': len(nid),
+            'Vertex physical positions': positions,
+            'Edges': edge_objs,
+            'Start index': nid[0],
+            'Destination index': {str(n): nid[int(d)] for n, d in enumerate(dests)}
+        }, f)
+
+    with open(physical_path, 'w', encoding='utf-8') as f:
+        f.write('obs\n')
+        f.writelines(f'{x} {y}\n' for x, y in sorted(map(tuple, obstacles.tolist())))
+        f.write(f'pois\nlength\n{length}\nwidth\n{width}\n')
+
+    return virtual_path, physical_path, mapping_path
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('--output-prefix', '-o',
+                        dest='prefix',
+                        type=str,
+                        required=True,
+                        help='files are written to {prefix}_virtual.txt, {prefix}_physical.txt and {prefix}_tophy.json'
+                        )
+    parser.add_argument('--nodes',
+                        dest='nodes',
+                        type=int,
+                        default=1000
+                        )
+    parser.add_argument('--destinations',
+                        dest='destinations',
+                        type=int,
+                        default=20
+                        )
+    parser.add_argument('--grid',
+                        dest='grid',
+                        type=int,
+                        default=100,
+                        help='side of the square physical grid'
+                        )
+    parser.add_argument('--neighbors',
+                        dest='neighbors',
+                        type=int,
+                        default=3,
+                        help='link every virtual node to this many nearest nodes'
+                        )
+    parser.add_argument('--obstacle-ratio',
+                        dest='obstacle_ratio',
+                        type=float,
+                        default=0.15,
+                        help='ratio of physical grids that are obstacles'
+                        )
+    parser.add_argument('--virtual-size',
+                        dest='virtual_size',
+                        type=int,
+                        default=10000,
+                        help='virtual nodes are in a square of this side'
+                        )
+    parser.add_argument('--seed',
+                        dest='seed',
+                        type=int,
+                        default=0
+                        )
+    args = parser.parse_args()
+    for p in write_world(
+            args.prefix, args.nodes, args.neighbors, args.destinations, args.grid, args.grid, args.obstacle_ratio,
+            args.virtual_size, args.seed):
+        print(p)
@@ -0,0 +1,177 @@
+from collections import deque
+from heapq import heappop, heappush
+from math import sqrt
+import networkx as nx
+import numpy as np
+
+# chess queen move directions
+DIRECTIONS = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]
+DIRECTION_INDEX = {d: i for i, d in enumerate(DIRECTIONS)}
+
+
+def reach_lengths(free: np.ndarray, dx: int, dy: int) -> np.ndarray:
+    """
+        input: boolean mask of free grids, direction
+        return: array of the number of free grids in a row from every grid toward (dx, dy),
+            not counting the grid itself, until an obstacle or the boundary
+
+        computed one line at a time from the far end: a grid reaches one more than its next grid
+        if the next grid is free, so every line is one vectorized step
+    """
+    if dx == 0:
+        return reach_lengths(free.T, dy, dx).T
+    length, width = free.shape
+    dtype = np.uint16 if max(length, width) < 2**16 else np.uint32
+    reach = np.zeros((length, width), dtype=dtype)
+    # next_free[y] / next_reach[y] are of the grid (x + dx, y + dy)
+    next_free = np.zeros(width, dtype=bool)
+    next_reach = np.zeros(width, dtype=dtype)
+    for x in (range(length - 2, -1, -1) if dx == 1 else range(1, length)):
+        row_free, row_reach = free[x + dx], reach[x + dx]
+        if dy == 0:
+            next_free, next_reach = row_free, row_reach
+        elif dy == 1:
+            next_free[:-1], next_reach[:-1] = row_free[1:], row_reach[1:]
+        else:
+            next_free[1:], next_reach[1:] = row_free[:-1], row_reach[:-1]
+        reach[x] = np.where(next_free, next_reach + 1, 0)
+    return reach
+
+
+class PhyGrid():
+    """
+        physical network as a boolean obstacle mask, obstacle[x, y] is True if (x, y) is an obstacle
+
+        the queen-move neighbors that get_phnet would store as edges are answered on demand from
+        a line-of-sight index: reach[d, x, y] is the number of free grids in a row from (x, y) toward
+        DIRECTIONS[d]. memory is 8 small integers per grid instead of one edge per pair of grids on a
+        free line, and has_edge is O(1)
+    """
+    def __init__(self, obstacle: np.ndarray) -> None:
+        self.obstacle = obstacle
+        self.length, self.width = obstacle.shape
+        free = ~np.asarray(obstacle)
+        self.reach = np.stack([reach_lengths(free, dx, dy) for dx, dy in DIRECTIONS])
+
+    @classmethod
+    def from_obstacles(cls, obs: set, length: int, width: int) -> 'PhyGrid':
+        obstacle = np.zeros((length, width), dtype=bool)
+        obs = [(x, y) for x, y in obs if 0 <= x < length and 0 <= y < width]
+        if obs:
+            xs, ys = zip(*obs)
+            obstacle[list(xs), list(ys)] = True
+        return cls(obstacle)
+
+    def __contains__(self, n) -> bool:
+        return (
+            n is not None
+            and 0 <= n[0] < self.length and 0 <= n[1] < self.width
+            and not self.obstacle[n[0], n[1]]
+        )
+
+    def has_node(self, n) -> bool:
+        return n in self
+
+    def number_of_nodes(self) -> int:
+        return int(self.obstacle.size - np.count_nonzero(self.obstacle))
+
+    def has_edge(self, u, v) -> bool:
+        # u and v are neighbors if they are on one queen line with no obstacle in between
+        if u == v or u not in self:
+            return False
+        dx, dy = v[0] - u[0], v[1] - u[1]
+        if dx != 0 and dy != 0 and abs(dx) != abs(dy):
+            return False
+        d = DIRECTION_INDEX[((dx > 0) - (dx < 0), (dy > 0) - (dy < 0))]
+        return self.reach[d, u[0], u[1]] >= max(abs(dx), abs(dy))
+
+    def neighbors(self, u):
+        x, y = u
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            for s in range(1, int(self.reach[d, x, y]) + 1):
+                yield (x + s * dx, y + s * dy)
+
+    def shortest_path(self, u, v) -> list:
+        """
+            input: source grid, target grid
+            return: path with the fewest queen moves
+
+            breadth-first over the neighbors in DIRECTIONS order, nearest grid first. the number of moves is
+            the same as nx.dijkstra_path on the dense phnet, but between paths with as many moves it may pick
+            another one, since the dense phnet visits neighbors in the order their edges were added
+        """
+        for n in (u, v):
+            if n not in self:
+                raise nx.NodeNotFound(f'Node {n} not in physical grid')
+        parent = {u: None}
+        queue = deque([u])
+        while queue and v not in parent:
+            n = queue.popleft()
+            for m in self.neighbors(n):
+                if m not in parent:
+                    parent[m] = n
+                    queue.append(m)
+        if v not in parent:
+            raise nx.NetworkXNoPath(f'No path between {u} and {v}')
+        path = [v]
+        while parent[path[-1]] is not None:
+            path.append(parent[path[-1]])
+        path.reverse()
+        return path
+
+    def astar_path(self, u, v) -> list:
+        """
+            input: source grid, target grid
+            return: shortest path in octile distance, given as queen-line hops like shortest_path
+
+            A* over the 8 single-grid moves with the octile heuristic, then every run of
+            moves in the same direction is merged into one hop, so consecutive grids of the
+            returned path are always on an obstacle-free queen line
+        """
+        for n in (u, v):
+            if n not in self:
+                raise nx.NodeNotFound(f'Node {n} not in physical grid')
+
+        def octile(n):
+            dx, dy = abs(v[0] - n[0]), abs(v[1] - n[1])
+            return max(dx, dy) + (sqrt(2) - 1) * min(dx, dy)
+
+        g = {u: 0}
+        parent = {u: None}
+        closed = set()
+        # (f, h, node), smaller h first on ties so the search goes straight at the target
+        heap = [(octile(u), octile(u), u)]
+        while heap:
+            _, _, n = heappop(heap)
+            if n == v:
+                break
+            if n in closed:
+                continue
+            closed.add(n)
+            for d, (dx, dy) in enumerate(DIRECTIONS):
+                m = (n[0] + dx, n[1] + dy)
+                if m in closed or not self.reach[d, n[0], n[1]]:
+                    continue
+                gm = g[n] + (sqrt(2) if dx and dy else 1)
+                if m not in g or gm < g[m]:
+                    g[m] = gm
+                    parent[m] = n
+                    h = octile(m)
+                    heappush(heap, (gm + h, h, m))
+        else:
+            raise nx.NetworkXNoPath(f'No path between {u} and {v}')
+
+        steps = [v]
+        while parent[steps[-1]] is not None:
+            steps.append(parent[steps[-1]])
+        steps.reverse()
+        # keep only the grids where the direction changes
+        path = [steps[0]]
+        for i in range(1, len(steps) - 1):
+            d1 = (steps[i][0] - steps[i-1][0], steps[i][1] - steps[i-1][1])
+            d2 = (steps[i+1][0] - steps[i][0], steps[i+1][1] - steps[i][1])
+            if d1 != d2:
+                path.append(steps[i])
+        if len(steps) > 1:
+            path.append(steps[-1])
+        return path
@@ -1,20 +1,34 @@
-from argparse import ArgumentParser
-import cProfile
-from io import StringIO
-import pstats
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
+from contextlib import nullcontext
+from importlib.util import find_spec
+import json
+from multiprocessing import Pool
+import os
 from time import time
 import networkx as nx
 
 from algo import find_tfvrpath
-from nets import get_phnet, get_vrnet, make_tfvrnet
-from out import output_image, output_json
+from cache import NetCache, PathCache, file_digest
+from csr import CSRGraph, get_csr
+from metrics import METRICS
+from nets import get_phnet, get_vrnet, make_tfvrnet, set_vrnet_weight, update_tfvrnet
 
 
-def get_paths(tfvrnet: nx.Graph, vrnet: nx.Graph, phnet: nx.Graph, tfvrpath: list, source):
+def get_paths(
+        tfvrnet: nx.Graph, vrnet: nx.Graph, phnet, tfvrpath: list, source, phsearch: str = 'queen',
+        phcache: PathCache = None, csr: CSRGraph = None):
     """
-        input: transformed virtual network, virtual network, physical network, found virtual path, source node
+        input: transformed virtual network, virtual network, physical network (nx.Graph or PhyGrid), found virtual path, source node,
+            physical search method, cache of physical sub-paths found by the same phnet and phsearch,
+            CSR form of vrnet to read the edge costs and lengths from
         return: virtual path, physical path, total_cost, total_length
+
+        phsearch:
+        - 'queen': path with the fewest queen moves
+        - 'astar': shortest path in octile distance, only on PhyGrid
     """
+    assert phsearch in ('queen', 'astar')
+    assert phsearch == 'queen' or not isinstance(phnet, nx.Graph)
     # rotate tfvrpath so that it is a circle with the source as first element
     n = tfvrpath.index(source)
     if tfvrpath[0] == tfvrpath[-1]:
@@ -32,25 +46,262 @@ def get_paths(tfvrnet: nx.Graph, vrnet: nx.Graph, phnet: nx.Graph, tfvrpath: lis
             vrsubpath = list(reversed(vrsubpath))
         vrpath.extend(vrsubpath[1:])
 
+    if isinstance(phnet, nx.Graph):
+        search = lambda u, v: nx.dijkstra_path(phnet, u, v)
+    elif phsearch == 'astar':
+        search = phnet.astar_path
+    else:
+        search = phnet.shortest_path
+    hits, misses = (phcache.hits, phcache.misses) if phcache is not None else (0, 0)
+
     phpath = [vrnet.nodes[vrpath[0]]['phy']]
+    fallbacks = 0
     for i in range(len(vrpath)-1):
         u, v = vrnet.nodes[vrpath[i]]['phy'], vrnet.nodes[vrpath[i+1]]['phy']
         if phnet.has_edge(u, v):
             phpath.append(v)
         else:
+            fallbacks += 1
             try:
-                sp = nx.dijkstra_path(phnet, u, v)
+                sp = phcache.get(u, v, search) if phcache is not None else search(u, v)
             except nx.NetworkXNoPath as nopatherror:
                 print(f'Can not find phyiscal path from {u} to {v}')
                 raise nopatherror 
             phpath.extend(sp[1:])
+    METRICS.incr('fallback searches', fallbacks)
+    if phcache is not None:
+        METRICS.incr('phpath cache hits', phcache.hits - hits)
+        METRICS.incr('phpath cache misses', phcache.misses - misses)
 
-    total_cost = sum(vrnet.edges[vrpath[n], vrpath[n+1]]['cost'] for n in range(len(vrpath) - 1))
-    total_length = sum(vrnet.edges[vrpath[n], vrpath[n+1]]['length'] for n in range(len(vrpath) - 1))
+    if csr is not None:
+        total_cost, total_length = csr.path_totals(vrpath)
+    else:
+        total_cost = sum(vrnet.edges[vrpath[n], vrpath[n+1]]['cost'] for n in range(len(vrpath) - 1))
+        total_length = sum(vrnet.edges[vrpath[n], vrpath[n+1]]['length'] for n in range(len(vrpath) - 1))
     return tfvrpath, vrpath, phpath, total_cost, total_length
 
 
-if __name__ == '__main__':
+def parse_alpha(s: str) -> list:
+    """
+        input: a single alpha like '0.5' or an inclusive range 'start:stop:step' like '0:1:0.05'
+        return: list of alpha values
+    """
+    try:
+        parts = [float(p) for p in s.split(':')]
+    except ValueError:
+        raise ArgumentTypeError(f'invalid alpha: {s}')
+    if len(parts) == 1:
+        return parts
+    if len(parts) != 3 or parts[2] <= 0 or parts[1] < parts[0]:
+        raise ArgumentTypeError(f'alpha range should be start:stop:step with start <= stop and step > 0, got: {s}')
+    start, stop, step = parts
+    n = int(round((stop - start) / step, 6))
+    # round away the float error so that file names are like _alpha0.15_ instead of _alpha0.15000000000000002_
+    return [round(start + i * step, 10) for i in range(n + 1)]
+
+
+def write_progress(
+        progress_file, alpha: float, vrnet: nx.Graph, nodes: set, objective: float, path: list, elapsed: float) -> None:
+    """
+        input: file to write to, alpha, virtual network, nodes of interest, objective, tfvrpath and seconds of
+            an improved path reported by find_tfvrpath
+
+        one JSON line per improved path, flushed so a reader can take the latest one while the search runs.
+        only a path with Complete true visits every node of interest and can be planned
+    """
+    missing = nodes - set(path)
+    progress_file.write(json.dumps({
+        'Alpha': alpha,
+        'Objective': objective,
+        'Length': len(path),
+        'Elapsed': elapsed,
+        'Complete': not missing,
+        'Missing': sorted(vrnet.nodes[n]['nid'] for n in missing),
+        'Path': [vrnet.nodes[n]['nid'] for n in path]
+    }) + '\n')
+    progress_file.flush()
+
+
+def plan(
+        vrnet: nx.Graph, phnet, source, destinations: set, args, tfvrnet: nx.Graph = None,
+        phcache: PathCache = None, warm_start: list = None) -> tuple:
+    """
+        input: virtual network, physical network, source, destinations, arguments with a single alpha,
+            tfvrnet of args.alpha if it is already built, cache of physical sub-paths,
+            tfvrpath of an earlier plan to warm start the search with
+        return: result dict with the totals, timings and how the search ended ('Search', see find_tfvrpath),
+            tfvrnet, tfvrpath, virtual path, physical path
+            'Error' is set in the result dict and the paths are None if there is no valid path
+
+        vrnet edge weights are reset in place when the tfvrnet is built, so vrnet can be reused for other alphas
+    """
+    result = {'Alpha': args.alpha}
+
+    time_tfvrnet = time()
+    if tfvrnet is None:
+        tfvrnet = make_tfvrnet(
+            vrnet, source, destinations, args.alpha, args.tfvrnet_engine, args.workers, args.oracle_dir)
+    print(f'transformed virtual network has {tfvrnet.number_of_nodes()} nodes and {tfvrnet.number_of_edges()} edges')
+    time_findpaths = time()
+    print(f'make tfvrnet: {time_findpaths-time_tfvrnet} seconds')
+
+    ######## FIND VIRTUAL PATH
+
+    result['Search'] = dict()
+    # improved paths are appended, so every alpha of a sweep adds its own lines
+    with open(args.progress_filepath, 'a', encoding='utf-8') if args.progress_filepath else nullcontext() as progress_file:
+        on_improve = None
+        if progress_file is not None:
+            on_improve = lambda objective, path, elapsed: write_progress(
+                progress_file, args.alpha, vrnet, destinations | {source}, objective, path, elapsed)
+        tfvrpath = find_tfvrpath(
+            tfvrnet, args.sn, args.vritmax, args.search_engine, args.max_queue, args.search_workers, warm_start,
+            args.time_budget, on_improve, result['Search'])
+    time_getpaths = time()
+    result['Timings'] = {
+        'tfvrnet': time_findpaths - time_tfvrnet,
+        'find tfvrpath': time_getpaths - time_findpaths
+    }
+    try:
+        assert set(tfvrpath) == destinations | {source}
+    except AssertionError:
+        missing = (destinations | {source}) - set(tfvrpath)
+        print('Error: tfvrpath does not contain all destinations or source. Missing:', missing)
+        result['Error'] = f'tfvrpath does not contain all destinations or source. Missing: {missing}'
+        return result, tfvrnet, None, None, None
+
+    ######## GET CORRESPONDING PHYSICAL PATH
+
+    tfvrpath, vrpath, phpath, total_cost, total_length = get_paths(
+        tfvrnet, vrnet, phnet, tfvrpath, source, args.phsearch, phcache,
+        get_csr(vrnet) if args.tfvrnet_engine == 'csgraph' else None)
+    result['Timings']['get paths'] = time() - time_getpaths
+    METRICS.add_time('physical reconstruction', result['Timings']['get paths'])
+    result['Total cost'] = total_cost
+    result['Total length'] = total_length
+    print(f'tfvrpath: {tfvrpath}')
+    # print(f'vrpath: {vrpath}')
+    # print(f'phpath: {phpath}')
+    print(f'total cost: {total_cost}, total length: {total_length}')
+    if args.cost_limit:
+        if total_cost > args.cost_limit:
+            print(f'Can not find path: total cost: {total_cost} is larger than cost limit: {args.cost_limit}')
+            result['Error'] = f'total cost: {total_cost} is larger than cost limit: {args.cost_limit}'
+            return result, tfvrnet, tfvrpath, None, None
+
+    print(f'find paths: {time()-time_findpaths} seconds')
+    return result, tfvrnet, tfvrpath, vrpath, phpath
+
+
+def replan(
+        vrnet: nx.Graph, phnet, source, destinations: set, args, tfvrnet: nx.Graph, prev_tfvrpath: list,
+        phcache: PathCache = None, warm_start: bool = False) -> tuple:
+    """
+        input: virtual network, physical network, new source, new destinations, arguments with a single alpha,
+            tfvrnet of an earlier plan with the same vrnet and args.alpha, tfvrpath of that plan,
+            cache of physical sub-paths, whether to warm start the search from prev_tfvrpath
+        return: same as plan
+
+        incremental plan for a few added or removed destinations: the tfvrnet is updated by update_tfvrnet
+        instead of rebuilt, which gives the same search as a cold plan. with warm_start, the search also
+        starts from prev_tfvrpath, so its result depends on the earlier plan and may differ from a cold plan
+    """
+    time_update = time()
+    tfvrnet, added, removed = update_tfvrnet(
+        tfvrnet, vrnet, source, destinations, args.alpha, args.tfvrnet_engine, args.oracle_dir)
+    time_update = time() - time_update
+    result, tfvrnet, tfvrpath, vrpath, phpath = plan(
+        vrnet, phnet, source, destinations, args, tfvrnet, phcache, prev_tfvrpath if warm_start else None)
+    result['Timings']['tfvrnet'] = time_update
+    result['Replan'] = {'Added': len(added), 'Removed': len(removed), 'Warm start': warm_start}
+    return result, tfvrnet, tfvrpath, vrpath, phpath
+
+
+def run_alpha(vrnet: nx.Graph, phnet, source, destinations: set, ph_world_info: tuple, args,
+              cache: NetCache = None, nets_key: str = None, phcache: PathCache = None) -> dict:
+    """
+        input: virtual network, physical network, source, destinations, physical world info, arguments with a single alpha,
+            net cache and the key of the input networks if caching is enabled, cache of physical sub-paths
+        return: result dict of plan, with the metrics of this alpha under 'Metrics'
+
+        plan with the tfvrnet of args.alpha, taken from the cache if possible, and write the outputs of this alpha
+    """
+    mark = METRICS.mark()
+    tfvrnet_key = NetCache.key(nets_key, args.alpha, args.tfvrnet_engine) if cache else None
+    tfvrnet = cache.load(tfvrnet_key) if cache else None
+    if tfvrnet is not None:
+        print('transformed virtual network loaded from cache')
+        set_vrnet_weight(vrnet, args.alpha)
+    elif cache:
+        tfvrnet = make_tfvrnet(
+            vrnet, source, destinations, args.alpha, args.tfvrnet_engine, args.workers, args.oracle_dir)
+        cache.store(tfvrnet_key, tfvrnet)
+
+    result, tfvrnet, _, vrpath, phpath = plan(vrnet, phnet, source, destinations, args, tfvrnet, phcache)
+
+    ######## OUTPUT
+
+    if args.output and 'Error' not in result:
+        # out imports matplotlib, which takes longer than everything else at startup, so only import it when needed
+        with METRICS.phase('output'):
+            from out import output_image, output_json
+            output_json(vrpath, result['Total cost'], result['Total length'], vrnet, args, result['Search'])
+            output_image(
+                vrpath, result['Total cost'], result['Total length'], vrnet, source, destinations, phpath, ph_world_info, args)
+
+    result['Metrics'] = METRICS.since(mark)
+    return result
+
+
+def load_worlds(args) -> tuple:
+    """
+        input: parsed arguments
+        return: virtual network, source, destinations, physical network, obstacles, length, width, net cache, nets key
+            the net cache and nets key are None if caching is not enabled
+    """
+    cache = nets_key = None
+    if args.cache_dir:
+        cache = NetCache(args.cache_dir, int(args.cache_max_mb * 2**20))
+        nets_key = NetCache.key(
+            file_digest(args.virtual_filepath),
+            file_digest(args.vp_mapping_filepath) if args.vp_mapping_filepath else None,
+            file_digest(args.physical_filepath),
+            args.dense_phnet
+        )
+
+    nets = cache.load(nets_key) if cache else None
+    if nets is None:
+        vrnet, source, destinations = get_vrnet(args.virtual_filepath, args.vp_mapping_filepath)
+        phnet, obstacles, ph_l, ph_w = get_phnet(args.physical_filepath, args.dense_phnet)
+        if cache:
+            cache.store(nets_key, (vrnet, source, destinations, phnet, obstacles, ph_l, ph_w))
+    else:
+        print('virtual and physical networks loaded from cache')
+        vrnet, source, destinations, phnet, obstacles, ph_l, ph_w = nets
+
+    print(f'virtual network has {vrnet.number_of_nodes()} nodes and {vrnet.number_of_edges()} edges')
+    if args.dense_phnet:
+        print(f'physical network has {phnet.number_of_nodes()} nodes and {phnet.number_of_edges()} edges')
+    else:
+        print(f'physical network is a {ph_l}x{ph_w} grid with {phnet.number_of_nodes()} free grids')
+    return vrnet, source, destinations, phnet, obstacles, ph_l, ph_w, cache, nets_key
+
+
+# (vrnet, phnet, source, destinations, ph_world_info, cache, nets_key, phcache) of the sweep worker process
+_sweep_world = None
+
+
+def init_sweep_worker(world: tuple) -> None:
+    global _sweep_world
+    _sweep_world = world
+
+
+def sweep_alpha(args) -> dict:
+    vrnet, phnet, source, destinations, ph_world_info, cache, nets_key, phcache = _sweep_world
+    return run_alpha(vrnet, phnet, source, destinations, ph_world_info, args, cache, nets_key, phcache)
+
+
+def make_parser() -> ArgumentParser:
     parser = ArgumentParser()
     parser.add_argument('--virtual-world-file', '-v',
                         dest='virtual_filepath',
@@ -64,8 +315,8 @@ if __name__ == '__main__':
                         )
     parser.add_argument('--virtual-physical-mapping-file', '-m',
                         dest='vp_mapping_filepath',
-                        required=True,
-                        type=str
+                        type=str,
+                        help='not needed when the virtual world is a binary world directory'
                         )
     parser.add_argument('--seeding-number', '--sn',
                         dest='sn',
@@ -79,6 +330,17 @@ if __name__ == '__main__':
                         default=1000000,
                         help='limit of iteration, set -1 to be unlimited'
                         )
+    parser.add_argument('--time-budget',
+                        dest='time_budget',
+                        type=float,
+                        help='stop the search for the virtual path after this many seconds and take the best path so far'
+                        )
+    parser.add_argument('--progress',
+                        dest='progress_filepath',
+                        type=str,
+                        help='write every improved virtual path of the search to this file as a JSON line '
+                             'of alpha, objective, length, elapsed seconds, whether it is complete, missing nids and path (list of nid)'
+                        )
     parser.add_argument('--cost-limit', '-c',
                         dest='cost_limit',
                         type=float,
@@ -86,10 +348,83 @@ if __name__ == '__main__':
                         help='limit of iteration, set -1 to be unlimited'
                         )
     parser.add_argument('--alpha', '-a',
-                        dest='alpha',
+                        dest='alphas',
+                        type=parse_alpha,
+                        default=[1.0],
+                        help='alpha for transformed virtual network edge weight, or a range start:stop:step to sweep over'
+                        )
+    parser.add_argument('--search-engine',
+                        dest='search_engine',
+                        type=str,
+                        choices=['dict', 'array'],
+                        default='dict',
+                        help='expansion engine of find_tfvrpath: networkx neighbor scan, or pre-sorted integer neighbor lists'
+                        )
+    parser.add_argument('--max-queue', '--beam-width',
+                        dest='max_queue',
+                        type=int,
+                        help='keep at most this many paths in the priority queue, dropping the lowest upper bounds. unbounded if not set'
+                        )
+    parser.add_argument('--tfvrnet-engine',
+                        dest='tfvrnet_engine',
+                        type=str,
+                        choices=['dijkstra', 'pairwise', 'oracle', 'csgraph'],
+                        default='dijkstra',
+                        help='how to find shortest paths between nodes of interest: one dijkstra tree per node, one search per pair, '
+                             'queries to hub labels of vrnet that are built once per alpha, '
+                             'or one scipy.sparse.csgraph tree per node on the CSR form of vrnet (needs scipy)'
+                        )
+    parser.add_argument('--oracle-dir',
+                        dest='oracle_dir',
+                        type=str,
+                        nargs='?',
+                        const='oracle',
+                        help='save the hub labels of --tfvrnet-engine oracle in this directory and load them from it'
+                        )
+    parser.add_argument('--workers',
+                        dest='workers',
+                        type=int,
+                        default=1,
+                        help='number of processes used to build the transformed virtual network, or to run the alphas of a sweep'
+                        )
+    parser.add_argument('--search-workers',
+                        dest='search_workers',
+                        type=int,
+                        default=1,
+                        help='number of processes that search disjoint parts of the seeds and share Omax, only with --search-engine array. '
+                             'every process may run --vritmax iterations. the found path may differ from a single process search, '
+                             'and starting the processes costs more than a short search, so compare the expansion time in the metrics'
+                        )
+    parser.add_argument('--dense-phnet',
+                        dest='dense_phnet',
+                        action='store_true',
+                        help='build the physical network as a networkx queen-move graph instead of an obstacle grid, only for small grids'
+                        )
+    parser.add_argument('--phy-search',
+                        dest='phsearch',
+                        type=str,
+                        choices=['queen', 'astar'],
+                        default='queen',
+                        help='physical path between non-adjacent grids: fewest queen moves, or a* in octile distance (not with --dense-phnet)'
+                        )
+    parser.add_argument('--phpath-cache-size',
+                        dest='phpath_cache_size',
+                        type=int,
+                        default=10000,
+                        help='number of physical sub-paths kept in memory for reuse, 0 to disable'
+                        )
+    parser.add_argument('--cache-dir',
+                        dest='cache_dir',
+                        type=str,
+                        nargs='?',
+                        const='cache',
+                        help='enable on-disk cache of built networks in this directory'
+                        )
+    parser.add_argument('--cache-max-mb',
+                        dest='cache_max_mb',
                         type=float,
-                        default=1.0,
-                        help='alpha for transformed virtual network edge weight'
+                        default=1024,
+                        help='size limit of the cache directory, least recently used entries are deleted beyond it'
                         )
     parser.add_argument('--output-filepath', '-o',
                         dest='output',
@@ -98,14 +433,57 @@ if __name__ == '__main__':
                         const='output/out',
                         help='enable output'
                         )
+    parser.add_argument('--renderer',
+                        dest='renderer',
+                        type=str,
+                        choices=['fast', 'legacy'],
+                        default='fast',
+                        help='fast draws each kind of mark as one artist, legacy draws one artist per grid, node and hop'
+                        )
+    parser.add_argument('--label-every',
+                        dest='label_every',
+                        type=int,
+                        default=1,
+                        help='label every n-th node of the paths in the image, 0 for no labels'
+                        )
+    parser.add_argument('--metrics',
+                        dest='metrics_filepath',
+                        type=str,
+                        help='write phase timings and counters as json to this file, '
+                             'defaults to {output}_metrics.json when output is enabled'
+                        )
     parser.add_argument('--profile',
                         dest='use_profile',
                         action="store_true",
                         help='enable profiling'
                         )
+    return parser
+
+
+def check_args(parser: ArgumentParser, args, single_alpha: bool = False) -> None:
+    if args.vp_mapping_filepath is None and not os.path.isdir(args.virtual_filepath):
+        parser.error('--virtual-physical-mapping-file is required unless the virtual world is a binary world directory')
+    if args.phsearch == 'astar' and args.dense_phnet:
+        parser.error('--phy-search astar runs on the obstacle grid and can not be used with --dense-phnet')
+    if args.max_queue is not None and args.max_queue <= 0:
+        parser.error('--max-queue should be a positive number of paths')
+    if args.search_workers > 1 and args.search_engine != 'array':
+        parser.error('--search-workers needs --search-engine array')
+    if args.workers > 1 and len(args.alphas) == 1 and args.tfvrnet_engine != 'dijkstra':
+        parser.error('--workers builds the tfvrnet in parallel only with --tfvrnet-engine dijkstra')
+    if args.tfvrnet_engine == 'csgraph' and find_spec('scipy') is None:
+        parser.error('--tfvrnet-engine csgraph needs scipy, which is not installed')
+    if single_alpha and len(args.alphas) > 1:
+        parser.error('--alpha should be one value here, a range is not planned, set alpha per request instead')
+
+
+if __name__ == '__main__':
+    parser = make_parser()
     args = parser.parse_args()
+    check_args(parser, args)
 
     if args.use_profile:
+        import cProfile
         print('Profiling...')
         pr = cProfile.Profile()
         pr.enable()
@@ -117,56 +495,72 @@ if __name__ == '__main__':
 
     time_getnets = time()
 
-    vrnet, source, destinations = get_vrnet(args.virtual_filepath, args.vp_mapping_filepath)
-
-    phnet, obstacles, ph_l, ph_w = get_phnet(args.physical_filepath)
+    vrnet, source, destinations, phnet, obstacles, ph_l, ph_w, cache, nets_key = load_worlds(args)
     ph_world_info = (obstacles, ph_l, ph_w)
-
-    tfvrnet = make_tfvrnet(vrnet, source, destinations, args.alpha)
-
-    print(f'virtual network has {vrnet.number_of_nodes()} nodes and {vrnet.number_of_edges()} edges')
-    print(f'alpha: {args.alpha}, source: {source}, destination: {destinations}')
-    print(f'physical network has {phnet.number_of_nodes()} nodes and {phnet.number_of_edges()} edges')
-    print(f'transformed virtual network has {tfvrnet.number_of_nodes()} nodes and {tfvrnet.number_of_edges()} edges')
+    print(f'alpha: {args.alphas}, source: {source}, destination: {destinations}')
 
     print(f'read and make nets: {time()-time_getnets} seconds')
+    load_metrics = METRICS.to_dict()
 
     print(f'physical path cost limit: {args.cost_limit}')
-    print(f'algorithm parameter: itmax={args.vritmax} sn={args.sn}')
+    print(f'algorithm parameter: itmax={args.vritmax} sn={args.sn} time budget={args.time_budget}')
+    if args.progress_filepath:
+        # plan appends to it
+        open(args.progress_filepath, 'w+', encoding='utf-8').close()
 
-    time_findpaths = time()
+    ######## RUN EVERY ALPHA
 
-    ######## FIND VIRTUAL PATH
+    # physical sub-paths do not depend on alpha, so all alphas share one cache
+    phcache = PathCache(args.phpath_cache_size) if args.phpath_cache_size > 0 else None
 
-    tfvrpath = find_tfvrpath(tfvrnet, args.sn, args.vritmax)
-    try:
-        assert set(tfvrpath) == destinations | {source}
-    except AssertionError as e:
-        print('Error: tfvrpath does not contain all destinations or source. Missing:',
-              (destinations | {source}) - set(tfvrpath))
-        exit()
-
-    ######## GET CORRESPONDING PHYSICAL PATH
-
-    tfvrpath, vrpath, phpath, total_cost, total_length = get_paths(tfvrnet, vrnet, phnet, tfvrpath, source)
-    print(f'tfvrpath: {tfvrpath}')
-    # print(f'vrpath: {vrpath}')
-    # print(f'phpath: {phpath}')
-    print(f'total cost: {total_cost}, total length: {total_length}')
-    if args.cost_limit:
-        if total_cost > args.cost_limit:
-            print(f'Can not find path: total cost: {total_cost} is larger than cost limit: {args.cost_limit}')
+    alpha_args = [Namespace(**{**vars(args), 'alpha': alpha}) for alpha in args.alphas]
+    if len(alpha_args) == 1:
+        result = run_alpha(vrnet, phnet, source, destinations, ph_world_info, alpha_args[0], cache, nets_key, phcache)
+        results = [result]
+        if 'Error' in result:
             exit()
+    elif args.workers > 1:
+        # the networks go to each worker once, and every worker reweights its own copy of vrnet
+        # pool workers can not start their own pools, so tfvrnets are built serially inside them
+        for a in alpha_args:
+            a.workers = 1
+            a.search_workers = 1
+        # every worker gets its own empty copy of the path cache
+        world = (vrnet, phnet, source, destinations, ph_world_info, cache, nets_key, phcache)
+        with Pool(min(args.workers, len(alpha_args)), initializer=init_sweep_worker, initargs=(world,)) as pool:
+            results = list(pool.imap(sweep_alpha, alpha_args))
+    else:
+        results = [
+            run_alpha(vrnet, phnet, source, destinations, ph_world_info, a, cache, nets_key, phcache) for a in alpha_args
+        ]
 
-    print(f'find paths: {time()-time_findpaths} seconds')
-
-    ######## OUTPUT
+    if len(alpha_args) > 1:
+        print('alpha sweep:')
+        for r in results:
+            print(f"  alpha: {r['Alpha']}, total cost: {r.get('Total cost')}, total length: {r.get('Total length')}"
+                  + (f", error: {r['Error']}" if 'Error' in r else ''))
+        if args.output:
+            from out import output_sweep_json
+            output_sweep_json(results, args)
 
-    if args.output:
-        output_json(vrpath, total_cost, total_length, vrnet, args)
-        output_image(vrpath, total_cost, total_length, vrnet, source, destinations, phpath, ph_world_info, args)
+    print('metrics:')
+    for phase, seconds in load_metrics['Phases'].items():
+        print(f'  {phase}: {seconds:.3f} seconds')
+    for r in results:
+        print(f"  alpha {r['Alpha']}: " + ', '.join(
+            [f'{phase}: {seconds:.3f} seconds' for phase, seconds in r['Metrics']['Phases'].items()]
+            + [f'{name}: {n}' for name, n in r['Metrics']['Counters'].items()]
+        ))
+    if phcache is not None and (len(alpha_args) == 1 or args.workers <= 1):
+        # with a pool, the caches were in the workers and only their counters above came back
+        print(f'  physical path cache: {phcache.stats()}')
+    if args.metrics_filepath or args.output:
+        from out import output_metrics_json
+        output_metrics_json(load_metrics, results, args)
 
     if args.use_profile:
+        from io import StringIO
+        import pstats
         pr.disable()
         s = StringIO()
         pstats.Stats(pr, stream=s).strip_dirs().sort_stats('cumulative').print_stats()
@@ -0,0 +1,71 @@
+"""
+    run metrics: wall time of each phase and algorithm counters
+
+    every stage adds to the process-wide METRICS, hot loops count in local variables and add once at the end.
+    phases: parse, phnet build, tfvrnet build, seeding, expansion, physical reconstruction, output
+"""
+from contextlib import contextmanager
+from time import time
+
+
+class Metrics():
+    def __init__(self) -> None:
+        self.phases = dict()    # phase name -> seconds
+        self.counters = dict()  # counter name -> count, or the peak value for peak counters
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    @contextmanager
+    def phase(self, phase: str):
+        time_begin = time()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time() - time_begin)
+
+    def incr(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def peak(self, name: str, value) -> None:
+        self.counters[name] = max(self.counters.get(name, value), value)
+
+    def add_counters(self, counters: dict) -> None:
+        """
+            input: counters from since() of another process, peaks are merged as peaks
+        """
+        for name, n in counters.items():
+            if name.startswith('peak'):
+                self.peak(name, n)
+            else:
+                self.incr(name, n)
+
+    def to_dict(self) -> dict:
+        return {'Phases': dict(self.phases), 'Counters': dict(self.counters)}
+
+    def mark(self) -> dict:
+        """
+            return: snapshot to pass to since() later, peak counters start over from here
+        """
+        snapshot = self.to_dict()
+        for name in [c for c in self.counters if c.startswith('peak')]:
+            del self.counters[name]
+        return snapshot
+
+    def since(self, mark: dict) -> dict:
+        """
+            input: an earlier mark()
+            return: what has been added after it, peaks are the peaks after it
+        """
+        phases = {
+            p: s - mark['Phases'].get(p, 0)
+            for p, s in self.phases.items() if s != mark['Phases'].get(p, 0)
+        }
+        counters = {
+            c: (n if c.startswith('peak') else n - mark['Counters'].get(c, 0))
+            for c, n in self.counters.items() if c.startswith('peak') or n != mark['Counters'].get(c, 0)
+        }
+        return {'Phases': phases, 'Counters': counters}
+
+
+METRICS = Metrics()
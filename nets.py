@@ -1,20 +1,64 @@
-import json
+from heapq import heappop, heappush
+from multiprocessing import Pool
+import os
+from time import time
 import networkx as nx
+import numpy as np
 
-def get_phnet(path: str) -> nx.Graph:
+from binworld import load_obstacle, load_vrnet
+from csr import get_csr, vrnet_arrays
+from grid import DIRECTIONS, PhyGrid
+from metrics import METRICS
+from reader import JSONStream, iter_phy_obstacles, iter_vrnet_edges, report_throughput
+
+
+def read_phy(path: str) -> tuple:
+    """
+        input: physical world file path
+        return: obstacles, length, width
+    """
     with open(path, 'r', encoding='utf-8') as f:
-        c = f.readlines()
-    assert c[0] == 'obs\n'
-    obs = set()
-    i = 1
-    while c[i] != 'pois\n':
-        x, y = c[i].split()
-        obs.add((int(x), int(y)))
-        i += 1
-    # now i point to 'pois'
-    assert c[i+1] == 'length\n' and c[i+3] == 'width\n'
-    length = int(c[i+2])
-    width = int(c[i+4])
+        obs = set(iter_phy_obstacles(f))
+        assert f.readline() == 'length\n'
+        length = int(f.readline())
+        assert f.readline() == 'width\n'
+        width = int(f.readline())
+    return obs, length, width
+
+
+def get_phnet(path: str, dense: bool = False):
+    """
+        input: physical world file path, whether to build the dense queen-move graph
+        return: physical network, obstacles, length, width
+            obstacles is a set of grids, or the memory-mapped obstacle bitmap for a binary world
+
+        the physical network is a PhyGrid unless dense is set, then it is an nx.Graph with
+        an edge between every two grids on an obstacle-free queen line. the dense graph has
+        O(grids * line length) edges, so it is only for small grids
+
+        path can also be a binary world directory (see binworld.py), its obstacle bitmap is memory-mapped
+    """
+    time_begin = time()
+    if os.path.isdir(path):
+        obstacle = load_obstacle(path)
+        length, width = obstacle.shape
+        # no set of obstacle grids, the bitmap is all that is needed
+        obs = obstacle
+        print(f'loaded binary physical world in {time() - time_begin:.3f} seconds')
+        METRICS.add_time('parse', time() - time_begin)
+        if not dense:
+            with METRICS.phase('phnet build'):
+                return PhyGrid(obstacle), obs, length, width
+    else:
+        obs, length, width = read_phy(path)
+        report_throughput([path], time() - time_begin)
+        METRICS.add_time('parse', time() - time_begin)
+        if not dense:
+            with METRICS.phase('phnet build'):
+                return PhyGrid.from_obstacles(obs, length, width), obs, length, width
+    time_build = time()
+    grid = PhyGrid(obstacle) if os.path.isdir(path) else PhyGrid.from_obstacles(obs, length, width)
+    is_obstacle = grid.obstacle.tolist()
 
     # add all integer index coordinate as node except obs
     phnet = nx.Graph()
@@ -22,58 +66,86 @@ def get_phnet(path: str) -> nx.Graph:
                 (i, j)
             for j in range(width)
         for i in range(length)
-        if (i, j) not in obs
+        if not is_obstacle[i][j]
     ])
 
     # find all neighbors:
-    # for any grid, if you can go to another grid in chess queen moves, then that grid is a neighbor
-    direction = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]
+    # for any grid, if you can go to another grid in chess queen moves, then that grid is a neighbor.
+    # the line-of-sight index of the grid tells how far every line goes before an obstacle
+    reach = grid.reach.tolist()
     for ni in phnet.nodes():
-        for d in direction:
-            nj = ni[0] + d[0], ni[1] + d[1]
-            while 0 <= nj[0] < length and 0 <= nj[1] < width and nj not in obs:
-                phnet.add_edge(ni, nj)
-                nj = nj[0] + d[0], nj[1] + d[1]
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            for s in range(1, reach[d][ni[0]][ni[1]] + 1):
+                phnet.add_edge(ni, (ni[0] + s * dx, ni[1] + s * dy))
 
+    METRICS.add_time('phnet build', time() - time_build)
     return phnet, obs, length, width
 
 
-def get_vrnet(path: str, vpmap_path: str) -> nx.Graph:
+def read_vrnet(path: str, vpmap_path: str) -> tuple:
+    """
+        input: virtual world file path, virtual-physical mapping file path
+        return: full virtual network, node list in file order, edge list in file order,
+                the other top-level fields of the mapping file
+
+        both files are read as streams, so memory is the network itself and not the text of the files
+    """
+    time_begin = time()
     vrnet = nx.Graph()
-    with open(path, 'r', encoding='utf-8') as f:
-        ls = f.read().split('---\n')[1:]
     node_list = []
     node_set = set()
-    for e in ls:
-        n1, n2 = e.split('\n')[:2]
-        n1 = tuple(map(int, n1.split()))
-        n2 = tuple(map(int, n2.split()))
-        if n1 not in node_set:
-            vrnet.add_node(n1, nid=len(node_list))
-            node_list.append(n1)
-            node_set.add(n1)
-        if n2 not in node_set:
-            vrnet.add_node(n2, nid=len(node_list))
-            node_list.append(n2)
-            node_set.add(n2)
-        if not vrnet.has_edge(n1, n2):
-            vrnet.add_edge(n1, n2)
-
-    tophy = json.load(open(vpmap_path, 'r', encoding='utf-8'))
+    edge_list = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for n1, n2 in iter_vrnet_edges(f):
+            if n1 not in node_set:
+                vrnet.add_node(n1, nid=len(node_list), phy=None)
+                node_list.append(n1)
+                node_set.add(n1)
+            if n2 not in node_set:
+                vrnet.add_node(n2, nid=len(node_list), phy=None)
+                node_list.append(n2)
+                node_set.add(n2)
+            if not vrnet.has_edge(n1, n2):
+                vrnet.add_edge(n1, n2)
+                edge_list.append((n1, n2))
+
+    tophy = dict()
+    with open(vpmap_path, 'r', encoding='utf-8') as f:
+        js = JSONStream(f)
+        for key in js.items():
+            if key == 'Vertex physical positions':
+                for i in js.items():
+                    m = js.value()
+                    if int(i) < len(node_list):
+                        vrnet.nodes[node_list[int(i)]]['phy'] = (m['x'] // 5, m['y'] // 5)
+            elif key == 'Edges':
+                for _ in js.items():
+                    edge_obj = js.value()
+                    u, v = node_list[edge_obj['left']], node_list[edge_obj['right']]
+                    assert vrnet.has_edge(u, v)
+                    vrnet.edges[u, v]['length'] = edge_obj['length']
+                    vrnet.edges[u, v]['cost'] = edge_obj['cost']
+            else:
+                tophy[key] = js.value()
     assert tophy['Number of vertex'] == vrnet.number_of_nodes()
+    report_throughput([path, vpmap_path], time() - time_begin)
+    return vrnet, node_list, edge_list, tophy
 
-    for i, n in enumerate(node_list):
-        if str(i) in tophy['Vertex physical positions']:
-            m = tophy['Vertex physical positions'][str(i)]
-            vrnet.nodes[n]['phy'] = (m['x'] // 5, m['y'] // 5)
-        else:
-            vrnet.nodes[n]['phy'] = None
 
-    for edge_obj in tophy['Edges'].values():
-        u, v = node_list[edge_obj['left']], node_list[edge_obj['right']]
-        assert vrnet.has_edge(u, v)
-        vrnet.edges[u, v]['length'] = edge_obj['length']
-        vrnet.edges[u, v]['cost'] = edge_obj['cost']
+def get_vrnet(path: str, vpmap_path: str = None) -> nx.Graph:
+    """
+        input: virtual world file path, virtual-physical mapping file path
+        return: virtual network, source, destinations
+
+        path can also be a binary world directory (see binworld.py), then vpmap_path is not needed
+    """
+    time_begin = time()
+    if os.path.isdir(path):
+        vrnet, node_list, tophy = load_vrnet(path)
+        print(f'loaded binary virtual world in {time() - time_begin:.3f} seconds')
+    else:
+        vrnet, node_list, _, tophy = read_vrnet(path, vpmap_path)
+    METRICS.add_time('parse', time() - time_begin)
 
     # keep only the largest connected component
     largest_cc = max(nx.connected_components(vrnet), key=len)
@@ -86,36 +158,295 @@ def get_vrnet(path: str, vpmap_path: str) -> nx.Graph:
     return vrnet, source, destinations
 
 
-def make_tfvrnet(vrnet: nx.Graph, source: tuple, destnations: set, alpha: float) -> nx.Graph:
+def terminal_tree(adj, source, targets) -> tuple:
+    """
+        input: adjacency (node -> list of (neighbor, weight)), source node, target nodes
+        return: distance dict and predecessor dict of a dijkstra tree rooted at source
+
+        the search stops as soon as every target is settled, so the tree only covers
+        the part of the network that is closer to source than the farthest target
+    """
+    dist = {source: 0}
+    pred = {source: None}
+    settled = set()
+    remaining = set(targets)
+    remaining.discard(source)
+    heap = [(0, source)]
+    while heap and remaining:
+        d, u = heappop(heap)
+        if u in settled:
+            continue
+        settled.add(u)
+        remaining.discard(u)
+        for v, w in adj[u]:
+            nd = d + w
+            if v not in dist or nd < dist[v]:
+                dist[v] = nd
+                pred[v] = u
+                heappush(heap, (nd, v))
+    # unsettled nodes may still have a tentative distance, drop them
+    dist = {n: d for n, d in dist.items() if n in settled}
+    return dist, pred
+
+
+def trace_path(pred: dict, target) -> list:
+    """
+        input: predecessor dict from terminal_tree, target node
+        return: path from the root of the tree to target
+    """
+    path = [target]
+    while pred[path[-1]] is not None:
+        path.append(pred[path[-1]])
+    path.reverse()
+    return path
+
+
+def set_vrnet_weight(vrnet: nx.Graph, alpha: float) -> None:
+    """
+        input: virtual network, alpha
+        set the `weight` attribute of every vrnet edge in place
+    """
+    for u, v, attr in vrnet.edges(data=True):
+        assert 'length' in attr and 'cost' in attr
+        attr['weight'] = alpha * attr['length'] + (1 - alpha) * attr['cost']
+
+
+def tree_adj(indptr, indices, weights) -> list:
     """
-        input: virtual network, source vertex, destination vertices, alpha
+        input: CSR form of the weighted adjacency from vrnet_arrays
+        return: adjacency lists in the form terminal_tree and HubLabels.build read, node index -> list of (neighbor index, weight)
+    """
+    indices, weights = indices.tolist(), weights.tolist()
+    return [
+        list(zip(indices[indptr[i]:indptr[i+1]], weights[indptr[i]:indptr[i+1]]))
+        for i in range(len(indptr) - 1)
+    ]
+
+
+# adjacency lists of the tree worker process, set once by init_tree_worker
+_tree_adj = None
+
+
+def init_tree_worker(indptr, indices, weights) -> None:
+    global _tree_adj
+    _tree_adj = tree_adj(indptr, indices, weights)
+
+
+def terminal_paths(task: tuple, adj: list = None) -> tuple:
+    """
+        input: (source index, target indices), adjacency lists, default is the one of the tree worker process
+        return: source index, dict of target index -> (path as indices, weight)
+    """
+    s, targets = task
+    dist, pred = terminal_tree(_tree_adj if adj is None else adj, s, targets)
+    return s, {t: (trace_path(pred, t), dist[t]) for t in targets if t in dist}
+
+
+def make_tfvrnet(
+        vrnet: nx.Graph, source: tuple, destnations: set, alpha: float,
+        engine: str = 'dijkstra', workers: int = 1, oracle_dir: str = None) -> nx.Graph:
+    """
+        input: virtual network, source vertex, destination vertices, alpha, engine, number of worker processes,
+            directory of saved distance oracles
         return: transformed virtual network
+
+        engine:
+        - 'pairwise': one nx.shortest_path for every pair of nodes of interest
+        - 'dijkstra': one early-stopping dijkstra tree for every node of interest,
+          paths and weights to all later nodes of interest are read from that tree.
+          the trees are independent, so they are split across `workers` processes
+        - 'oracle': hub labels of vrnet for this alpha (see oracle.py) answer every pair. building them
+          costs more than one tfvrnet, but they are kept in memory and in oracle_dir, so later tfvrnets
+          of the same vrnet and alpha, like with other destinations, only pay for the queries
+        - 'csgraph': the same trees as 'dijkstra', on the CSR form of vrnet (see csr.py) in scipy.sparse.csgraph.
+          the trees are not stopped early, but they run in compiled code. equal-weight paths may be
+          broken differently than by 'dijkstra'
     """
+    assert engine in ('pairwise', 'dijkstra', 'oracle', 'csgraph')
+    assert workers == 1 or engine == 'dijkstra'
 
     # initialize transformd virtual network
-    print('making transformed virtual network')
+    print(f'making transformed virtual network with {engine} engine')
+    time_begin = time()
     nodes_of_interest = destnations.union([source])
     tfvrnet = nx.complete_graph(nodes_of_interest)
 
     # calc single edge weights on vrnet
-    for u, v, attr in vrnet.edges(data=True):
-        assert 'length' in attr and 'cost' in attr
-        vrnet.edges[u, v]['weight'] = alpha * attr['length'] + (1 - alpha) * attr['cost']
+    set_vrnet_weight(vrnet, alpha)
 
     # calc weights for tfvrnet
     edges_to_remove = []
-    for u, v in tfvrnet.edges():
-        try:
-            tfvrnet.edges[u, v]['path'] = nx.shortest_path(vrnet, u, v, weight='weight')
-        except nx.NetworkXNoPath:
-            edges_to_remove.append((u, v))
-        tfvrnet.edges[u, v]['weight'] = sum(
-            vrnet.edges[u, v]['weight']
-            for u, v in zip(tfvrnet.edges[u, v]['path'][:-1], tfvrnet.edges[u, v]['path'][1:])
-        )
-        # assert tfvrnet.edges[u, v]['weight'] == nx.shortest_path_length(vrnet, u, v, weight='weight')
+    if engine == 'pairwise':
+        METRICS.incr('dijkstra calls', tfvrnet.number_of_edges())
+        for u, v in tfvrnet.edges():
+            try:
+                tfvrnet.edges[u, v]['path'] = nx.shortest_path(vrnet, u, v, weight='weight')
+            except nx.NetworkXNoPath:
+                edges_to_remove.append((u, v))
+                continue
+            tfvrnet.edges[u, v]['weight'] = sum(
+                vrnet.edges[u, v]['weight']
+                for u, v in zip(tfvrnet.edges[u, v]['path'][:-1], tfvrnet.edges[u, v]['path'][1:])
+            )
+            # assert tfvrnet.edges[u, v]['weight'] == nx.shortest_path_length(vrnet, u, v, weight='weight')
+    elif engine == 'oracle':
+        # oracle imports nets, so it is imported here
+        from oracle import get_oracle
+        oracle = get_oracle(vrnet, alpha, oracle_dir)
+        time_queries = time()
+        for u, v in tfvrnet.edges():
+            try:
+                tfvrnet.edges[u, v]['path'], tfvrnet.edges[u, v]['weight'] = oracle.path(u, v)
+            except nx.NetworkXNoPath:
+                edges_to_remove.append((u, v))
+        METRICS.incr('oracle queries', tfvrnet.number_of_edges())
+        print(f'oracle queries: {time() - time_queries} seconds')
+    elif engine == 'csgraph':
+        csr = get_csr(vrnet)
+        csr.set_weight(alpha)
+        terminals = [csr.node_index[n] for n in tfvrnet.nodes()]
+        tasks = [(s, terminals[i+1:]) for i, s in enumerate(terminals[:-1])]
+        METRICS.incr('dijkstra calls', len(tasks))
+        found = csr.shortest_paths(tasks)
+        for s, targets in tasks:
+            u = csr.node_list[s]
+            for t in targets:
+                v = csr.node_list[t]
+                if (s, t) not in found:
+                    edges_to_remove.append((u, v))
+                    continue
+                path, weight = found[s, t]
+                tfvrnet.edges[u, v]['path'] = [csr.node_list[n] for n in path]
+                tfvrnet.edges[u, v]['weight'] = weight
+    else:
+        # both serial and parallel runs search on the same integer adjacency,
+        # so ties are broken the same way and the outputs are identical
+        node_list, indptr, indices, weights = vrnet_arrays(vrnet)
+        node_index = {n: i for i, n in enumerate(node_list)}
+        terminals = [node_index[n] for n in tfvrnet.nodes()]
+        # the pairs with earlier terminals are already done by their trees
+        tasks = [(s, terminals[i+1:]) for i, s in enumerate(terminals[:-1])]
+        METRICS.incr('dijkstra calls', len(tasks))
+        if workers > 1:
+            # the adjacency is sent once to each worker, not once per task
+            with Pool(workers, initializer=init_tree_worker, initargs=(indptr, indices, weights)) as pool:
+                trees = list(pool.imap_unordered(terminal_paths, tasks))
+        else:
+            # local, not the worker global, so the adjacency does not outlive this call in a long-running process
+            adj = tree_adj(indptr, indices, weights)
+            trees = [terminal_paths(task, adj) for task in tasks]
+        targets = dict(tasks)
+        for s, found in trees:
+            u = node_list[s]
+            for t in targets[s]:
+                v = node_list[t]
+                if t not in found:
+                    edges_to_remove.append((u, v))
+                    continue
+                path, weight = found[t]
+                tfvrnet.edges[u, v]['path'] = [node_list[n] for n in path]
+                # weight is accumulated along the path in the same order as the sum above
+                tfvrnet.edges[u, v]['weight'] = weight
 
     for etr in edges_to_remove:
         tfvrnet.remove_edge(*etr)
 
+    METRICS.add_time('tfvrnet build', time() - time_begin)
     return tfvrnet
+
+
+class WeightAdj():
+    """
+        adjacency of vrnet in the form terminal_tree reads, node -> list of (neighbor, weight),
+        read from vrnet when asked so the whole network is not converted for a few trees
+    """
+    def __init__(self, vrnet: nx.Graph) -> None:
+        self.adj = vrnet.adj
+
+    def __getitem__(self, u) -> list:
+        return [(v, attr['weight']) for v, attr in self.adj[u].items()]
+
+
+def update_tfvrnet(
+        tfvrnet: nx.Graph, vrnet: nx.Graph, source: tuple, destinations: set, alpha: float,
+        engine: str = 'dijkstra', oracle_dir: str = None) -> tuple:
+    """
+        input: transformed virtual network built by make_tfvrnet for the same vrnet and alpha,
+            virtual network, new source, new destinations, alpha, engine, directory of saved distance oracles
+        return: tfvrnet of the new nodes of interest, added nodes, removed nodes
+
+        the pairs of kept nodes are copied from tfvrnet, which is not changed, and only the pairs with an
+        added node are searched, by one early-stopping dijkstra tree from every added node ('dijkstra' and
+        'pairwise'), by oracle queries ('oracle') or by csgraph trees on the CSR form of vrnet ('csgraph').
+        the nodes and edges are in the same order as make_tfvrnet adds them, because find_tfvrpath breaks
+        ties by that order, and every path runs from the node that comes first in that order. the edges
+        and weights are those of make_tfvrnet, only a path between two nodes with another path of exactly
+        the same weight may be the other one
+    """
+    assert engine in ('pairwise', 'dijkstra', 'oracle', 'csgraph')
+    time_begin = time()
+    nodes_of_interest = destinations.union([source])
+    removed = set(tfvrnet.nodes()) - nodes_of_interest
+    added = [n for n in nodes_of_interest if n not in tfvrnet]
+    kept = [n for n in tfvrnet.nodes() if n in nodes_of_interest]
+    print(f'updating transformed virtual network: {len(added)} nodes added, {len(removed)} nodes removed')
+    set_vrnet_weight(vrnet, alpha)
+
+    # frozenset of the pair -> (path, weight) of the pairs with an added node
+    found = dict()
+    if engine == 'oracle':
+        from oracle import get_oracle
+        oracle = get_oracle(vrnet, alpha, oracle_dir)
+    elif engine == 'csgraph':
+        csr = get_csr(vrnet)
+        csr.set_weight(alpha)
+        # all trees in one go, pairs between added nodes are searched from the earlier one
+        tasks = [
+            (csr.node_index[u], [csr.node_index[v] for v in kept + added[i+1:]]) for i, u in enumerate(added)
+        ]
+        for (s, t), (path, weight) in csr.shortest_paths(tasks).items():
+            found[frozenset((csr.node_list[s], csr.node_list[t]))] = ([csr.node_list[n] for n in path], weight)
+        METRICS.incr('dijkstra calls', len(tasks))
+    else:
+        adj = WeightAdj(vrnet)
+    for i, u in enumerate(added):
+        # pairs between added nodes are searched from the earlier one
+        targets = kept + added[i+1:]
+        if engine == 'oracle':
+            for v in targets:
+                try:
+                    found[frozenset((u, v))] = oracle.path(u, v)
+                except nx.NetworkXNoPath:
+                    pass
+            METRICS.incr('oracle queries', len(targets))
+        elif engine != 'csgraph':
+            dist, pred = terminal_tree(adj, u, targets)
+            for v in targets:
+                if v in dist:
+                    found[frozenset((u, v))] = (trace_path(pred, v), dist[v])
+            METRICS.incr('dijkstra calls')
+
+    # built like make_tfvrnet: a complete graph, then the paths, then the pairs without a path are removed
+    updated = nx.complete_graph(nodes_of_interest)
+    edges_to_remove = []
+    for u, v in updated.edges():
+        if tfvrnet.has_edge(u, v):
+            path, weight = tfvrnet.edges[u, v]['path'], tfvrnet.edges[u, v]['weight']
+        elif frozenset((u, v)) in found:
+            path, weight = found[frozenset((u, v))]
+        else:
+            edges_to_remove.append((u, v))
+            continue
+        if path[0] != u:
+            # make_tfvrnet searches every pair from the node that comes first in the node order, and the
+            # trees sum the weight from there. hub label weights are the same from both ends
+            path = path[::-1]
+            if engine != 'oracle':
+                weight = sum(vrnet.edges[a, b]['weight'] for a, b in zip(path[:-1], path[1:]))
+        updated.edges[u, v]['path'] = path
+        updated.edges[u, v]['weight'] = weight
+    for etr in edges_to_remove:
+        updated.remove_edge(*etr)
+
+    METRICS.add_time('tfvrnet build', time() - time_begin)
+    return updated, added, removed
@@ -0,0 +1,205 @@
+"""
+    distance oracle of the weighted virtual network: pruned landmark hub labels
+
+    every node u has a label, a list of (hub, distance from u to hub, next node from u toward hub),
+    such that any two nodes s, t have a hub on one of their shortest paths in both labels.
+    then dist(s, t) = min over common hubs h of dist(s, h) + dist(h, t), and the path is read by
+    following the next nodes from s to h and from t to h
+
+    labels are built once per vrnet and alpha, by one pruned dijkstra from every node in order of
+    decreasing degree: a node is not labeled (nor expanded) when the labels found so far already give
+    a distance as short. the next node of a label is the dijkstra parent, which is always labeled with
+    the same hub because pruned nodes are never expanded
+
+    the labels are stored as CSR numpy arrays, saved with np.savez under a digest of the weighted
+    adjacency, so a changed world or alpha never reads a stale oracle
+"""
+from heapq import heappop, heappush
+import hashlib
+import os
+import networkx as nx
+import numpy as np
+
+from cache import VrnetMemo
+from csr import vrnet_arrays
+from nets import tree_adj
+
+ORACLE_VERSION = 1
+
+
+def graph_digest(node_list: list, indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray) -> str:
+    h = hashlib.sha256(f'v{ORACLE_VERSION}'.encode())
+    for a in (np.array(node_list, dtype=np.int64), indptr, indices, weights):
+        h.update(np.ascontiguousarray(a).tobytes())
+    return h.hexdigest()
+
+
+class HubLabels():
+    """
+        hub labels of a weighted vrnet, queried by vrnet nodes
+
+        label_ptr: (N+1,) label of node i is at [label_ptr[i], label_ptr[i+1])
+        hubs: rank of the hub in build order, increasing within a label
+        dists: distance from the node to the hub
+        parents: index of the next node toward the hub, -1 at the hub itself
+    """
+    def __init__(self, node_list: list, label_ptr, hubs, dists, parents, digest: str) -> None:
+        self.node_list = node_list
+        self.node_index = {n: i for i, n in enumerate(node_list)}
+        self.label_ptr = label_ptr
+        self.hubs = hubs
+        self.dists = dists
+        self.parents = parents
+        self.digest = digest
+
+    @classmethod
+    def build(cls, vrnet: nx.Graph) -> 'HubLabels':
+        """
+            input: virtual network with edge weight
+            return: hub labels of it
+        """
+        node_list, indptr, indices, weights = vrnet_arrays(vrnet)
+        n = len(node_list)
+        adj = tree_adj(indptr, indices, weights)
+        order = sorted(range(n), key=lambda i: (-len(adj[i]), i))
+        label_hubs = [[] for _ in range(n)]
+        label_dists = [[] for _ in range(n)]
+        label_parents = [[] for _ in range(n)]
+        # distance from the current root to every hub of the root, by hub rank
+        root_dist = [float('inf')] * n
+        inf = float('inf')
+
+        for rank, root in enumerate(order):
+            for h, d in zip(label_hubs[root], label_dists[root]):
+                root_dist[h] = d
+            dist = {root: 0}
+            settled = set()
+            heap = [(0, root, -1)]
+            while heap:
+                d, u, parent = heappop(heap)
+                if u in settled:
+                    continue
+                settled.add(u)
+                # prune if an earlier hub already gives a path this short
+                if min((root_dist[h] + du for h, du in zip(label_hubs[u], label_dists[u])), default=inf) <= d:
+                    continue
+                label_hubs[u].append(rank)
+                label_dists[u].append(d)
+                label_parents[u].append(parent)
+                for v, w in adj[u]:
+                    nd = d + w
+                    if nd < dist.get(v, inf):
+                        dist[v] = nd
+                        heappush(heap, (nd, v, u))
+            for h in label_hubs[root]:
+                root_dist[h] = inf
+
+        label_ptr = np.zeros(n + 1, dtype=np.int64)
+        label_ptr[1:] = np.cumsum([len(hs) for hs in label_hubs])
+        return cls(
+            node_list,
+            label_ptr,
+            np.fromiter((h for hs in label_hubs for h in hs), dtype=np.int64, count=label_ptr[-1]),
+            np.fromiter((d for ds in label_dists for d in ds), dtype=np.float64, count=label_ptr[-1]),
+            np.fromiter((p for ps in label_parents for p in ps), dtype=np.int64, count=label_ptr[-1]),
+            graph_digest(node_list, indptr, indices, weights)
+        )
+
+    def save(self, path: str) -> None:
+        # write to a temp file first so a crash never leaves a half-written oracle
+        tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(
+            tmp_path, node_xy=np.array(self.node_list, dtype=np.int64), label_ptr=self.label_ptr,
+            hubs=self.hubs, dists=self.dists, parents=self.parents, digest=np.array(self.digest))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'HubLabels':
+        with np.load(path) as f:
+            return cls(
+                list(map(tuple, f['node_xy'].tolist())), f['label_ptr'], f['hubs'], f['dists'], f['parents'],
+                str(f['digest']))
+
+    def _meet(self, s: int, t: int) -> tuple:
+        """
+            input: node indices
+            return: (distance, position of the best hub in the label of s, in the label of t),
+                or (inf, -1, -1) if s and t are not connected
+        """
+        ps, pt = self.label_ptr[s], self.label_ptr[t]
+        _, i, j = np.intersect1d(
+            self.hubs[ps:self.label_ptr[s+1]], self.hubs[pt:self.label_ptr[t+1]],
+            assume_unique=True, return_indices=True)
+        if len(i) == 0:
+            return float('inf'), -1, -1
+        sums = self.dists[ps + i] + self.dists[pt + j]
+        k = int(np.argmin(sums))
+        return float(sums[k]), int(ps + i[k]), int(pt + j[k])
+
+    def _to_hub(self, u: int, pos: int) -> list:
+        """
+            input: node index, position of a hub in its label
+            return: node indices from u to the hub
+        """
+        hub = self.hubs[pos]
+        path = [u]
+        parent = int(self.parents[pos])
+        while parent != -1:
+            path.append(parent)
+            begin, end = self.label_ptr[parent], self.label_ptr[parent+1]
+            pos = begin + int(np.searchsorted(self.hubs[begin:end], hub))
+            parent = int(self.parents[pos])
+        return path
+
+    def distance(self, u, v) -> float:
+        if u == v:
+            return 0
+        return self._meet(self.node_index[u], self.node_index[v])[0]
+
+    def path(self, u, v) -> tuple:
+        """
+            input: two vrnet nodes
+            return: shortest path from u to v as vrnet nodes, its weight
+            raise: nx.NetworkXNoPath if they are not connected
+        """
+        if u == v:
+            return [u], 0
+        s, t = self.node_index[u], self.node_index[v]
+        d, i, j = self._meet(s, t)
+        if i == -1:
+            raise nx.NetworkXNoPath(f'{u} and {v} are not connected')
+        to_hub, from_hub = self._to_hub(s, i), self._to_hub(t, j)
+        return [self.node_list[n] for n in to_hub + from_hub[-2::-1]], d
+
+
+# oracles of the vrnets of this process, per alpha
+_oracles = VrnetMemo()
+
+
+def get_oracle(vrnet: nx.Graph, alpha: float, oracle_dir: str = None) -> HubLabels:
+    """
+        input: virtual network with edge weight of alpha, alpha, directory of saved oracles
+        return: hub labels of vrnet, from memory, then from oracle_dir, then built and saved to oracle_dir
+    """
+    return _oracles.get(vrnet, lambda: load_oracle(vrnet, oracle_dir), alpha)
+
+
+def load_oracle(vrnet: nx.Graph, oracle_dir: str = None) -> HubLabels:
+    """
+        input: virtual network with edge weight, directory of saved oracles
+        return: hub labels of vrnet, from oracle_dir, or built and saved to oracle_dir
+    """
+    oracle = None
+    if oracle_dir:
+        os.makedirs(oracle_dir, exist_ok=True)
+        path = os.path.join(oracle_dir, f'{graph_digest(*vrnet_arrays(vrnet))}.npz')
+        if os.path.exists(path):
+            oracle = HubLabels.load(path)
+            print(f'distance oracle loaded from {path}')
+    if oracle is None:
+        print('building distance oracle')
+        oracle = HubLabels.build(vrnet)
+        print(f'distance oracle has {len(oracle.hubs)} labels, {len(oracle.hubs) / len(oracle.node_list):.1f} per node')
+        if oracle_dir:
+            oracle.save(path)
+    return oracle
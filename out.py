@@ -1,15 +1,19 @@
 import json
 import networkx as nx
-import matplotlib.pyplot as plt
 
 
-def output_json(vrpath: list, total_cost: float, total_length: float, vrnet: nx.Graph, args):
+def output_json(vrpath: list, total_cost: float, total_length: float, vrnet: nx.Graph, args, search: dict = None):
+    """
+        search: how the search ended, the 'Search' of the result dict of main.plan
+    """
     result_obj = {
         'Alpha': args.alpha,
         'Steps': [],
         'Total cost': total_cost,
         'Total length': total_length
     }
+    if search is not None:
+        result_obj['Search'] = search
 
     for i in range(len(vrpath) - 1):
         u, v = vrpath[i], vrpath[i+1]
@@ -24,11 +28,155 @@ def output_json(vrpath: list, total_cost: float, total_length: float, vrnet: nx.
     json.dump(result_obj, open(f'{args.output}_alpha{args.alpha}_path.json', 'w+', encoding='utf8'))
 
 
+def output_sweep_json(results: list, args):
+    """
+        results: list of the result dicts returned by main.run_alpha, one per alpha
+    """
+    sweep_obj = {
+        'Virtual world': args.virtual_filepath,
+        'Physical world': args.physical_filepath,
+        'Results': results
+    }
+    json.dump(sweep_obj, open(f'{args.output}_sweep.json', 'w+', encoding='utf8'), indent=2)
+
+
+def output_metrics_json(load_metrics: dict, results: list, args):
+    """
+        load_metrics: metrics of reading the worlds and making the nets
+        results: list of the result dicts returned by main.run_alpha, their 'Search' and 'Metrics' are written per alpha
+    """
+    metrics_obj = {
+        'Load': load_metrics,
+        'Alphas': [{'Alpha': r['Alpha'], 'Search': r.get('Search'), **r['Metrics']} for r in results]
+    }
+    path = args.metrics_filepath or f'{args.output}_metrics.json'
+    json.dump(metrics_obj, open(path, 'w+', encoding='utf8'), indent=2)
+
+
 def output_image(
         vrpath: list, total_cost: float, total_length: float, vrnet: nx.Graph, source, destinations,
         phpath:list, ph_world_info:tuple, args):
+    """
+        args.renderer chooses how to draw:
+        - 'fast': every kind of mark is one artist (scatter / LineCollection), seconds even on big grids
+        - 'legacy': one plt.plot per grid, node and hop
+    """
+    if getattr(args, 'renderer', 'fast') == 'legacy':
+        output_image_legacy(
+            vrpath, total_cost, total_length, vrnet, source, destinations, phpath, ph_world_info, args)
+    else:
+        output_image_fast(
+            vrpath, total_cost, total_length, vrnet, source, destinations, phpath, ph_world_info, args)
+
+
+def output_image_fast(
+        vrpath: list, total_cost: float, total_length: float, vrnet: nx.Graph, source, destinations,
+        phpath:list, ph_world_info:tuple, args):
+
+    # imported here so that writing json does not pay for the matplotlib import
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+    import numpy as np
+
+    obs, ph_l, ph_w = ph_world_info
+    # label every n-th path node, 0 for no labels
+    label_every = getattr(args, 'label_every', 1)
+
+    plt.figure(figsize=(12, 6))
+
+    ######## DRAW VIRTUAL WORLD
+
+    ax = plt.subplot(1, 2, 1)
+    plt.axis('off')
+
+    # draw path
+    ax.add_collection(LineCollection(list(zip(vrpath[:-1], vrpath[1:])), colors='r', linewidths=1))
+
+    # draw node, markersize of plt.plot is the square root of the size of scatter
+    vrpath_set = set(vrpath)
+    others = np.array([n for n in vrnet.nodes() if n not in vrpath_set]).reshape(-1, 2)
+    plt.scatter(others[:, 0], others[:, 1], s=2**2, c='g', marker='s', linewidths=1)
+
+    # draw path node
+    path_xy = np.array(vrpath).reshape(-1, 2)
+    colors = ['r' if n in destinations or n == source else 'b' for n in vrpath]
+    plt.scatter(path_xy[:, 0], path_xy[:, 1], s=2**2, c=colors, marker='s', linewidths=1)
+    if label_every > 0:
+        for i in range(0, len(vrpath), label_every):
+            n = vrpath[i]
+            plt.annotate(
+                str(i),
+                (n[0], n[1]+i/(len(phpath))*0.5),
+                color='k',
+                fontsize=8)
+
+    plt.figtext(
+        0.5, 0.99,
+        f'virtual world: {args.virtual_filepath}\n'
+            + f'source: {source}, destinations: {destinations}\n'
+            + f'sn: {args.sn} itmax: {args.vritmax}',
+        wrap=True,
+        horizontalalignment='center',
+        verticalalignment='top',
+        fontsize=12)
+
+    ######## DRAW PHYSICAL WORLD
+
+    ax = plt.subplot(1, 2, 2)
+    plt.axis('off')
+
+    # draw boundry
+    plt.plot([-1, ph_l, ph_l, -1, -1], [-1, -1, ph_w, ph_w, -1], 'k-', lw=1)
+
+    # draw obs, which is already the obstacle bitmap for a binary world
+    if isinstance(obs, np.ndarray):
+        obstacle = np.asarray(obs, dtype=bool)
+    else:
+        obstacle = np.zeros((ph_l, ph_w), dtype=bool)
+        in_grid = [(i, j) for i, j in obs if 0 <= i < ph_l and 0 <= j < ph_w]
+        if in_grid:
+            obstacle[tuple(np.array(in_grid).T)] = True
+    free_xy = np.argwhere(~obstacle)
+    obs_xy = np.argwhere(obstacle)
+    plt.scatter(free_xy[:, 0], free_xy[:, 1], s=2**2, c='g', marker='s', linewidths=1)
+    plt.scatter(obs_xy[:, 0], obs_xy[:, 1], s=4**2, c='k', marker='s', linewidths=1)
+
+    if phpath is not None:
+        # draw path
+        ax.add_collection(LineCollection(list(zip(phpath[:-1], phpath[1:])), colors='r', linewidths=1, zorder=3))
+        if label_every > 0:
+            for i in range(0, len(phpath), label_every):
+                n = phpath[i]
+                plt.annotate(
+                    str(i),
+                    (n[0], n[1]+i/(len(phpath))*0.5),
+                    color='k',
+                    fontsize=10)
+
+    plt.figtext(
+        0.5, 0.1,
+        f'physical world: {args.physical_filepath} alpha: {args.alpha}\n'
+            + f'cost: {total_cost} length: {total_length} cost limit: {args.cost_limit}',
+        wrap=True,
+        horizontalalignment='center',
+        verticalalignment='top',
+        fontsize=12)
+
+    plt.savefig(f'{args.output}_alpha{args.alpha}_img.png')
+    plt.close()
+
+
+def output_image_legacy(
+        vrpath: list, total_cost: float, total_length: float, vrnet: nx.Graph, source, destinations,
+        phpath:list, ph_world_info:tuple, args):
+
+    # imported here so that writing json does not pay for the matplotlib import
+    import matplotlib.pyplot as plt
 
     obs, ph_l, ph_w = ph_world_info
+    if not isinstance(obs, set):
+        # the obstacle bitmap of a binary world
+        obs = set(zip(*(a.tolist() for a in obs.nonzero())))
 
     plt.figure(figsize=(12, 6))
 
@@ -115,4 +263,5 @@ def output_image(
         verticalalignment='top',
         fontsize=12)
 
-    plt.savefig(f'{args.output}_alpha{args.alpha}_img.png')
\ No newline at end of file
+    plt.savefig(f'{args.output}_alpha{args.alpha}_img.png')
+    plt.close()
@@ -1,4 +1,6 @@
+from array import array
 import heapq
+from operator import gt, lt
 
 """
     (ub, path, o, tn, cur)
@@ -33,6 +35,15 @@ class MyPQ:
     def push(self, key, *values):
         _key = -key if self.order == 'descending' else key
         heapq.heappush(self.q, (_key, *values))
+
+    def extend(self, items):
+        """
+            push many (key, *values) tuples with one heapify instead of one heappush each
+        """
+        if self.order == 'descending':
+            items = [(-key, *values) for key, *values in items]
+        self.q.extend(items)
+        heapq.heapify(self.q)
     
     def pop(self):
         key, *values = heapq.heappop(self.q)
@@ -41,4 +52,192 @@ class MyPQ:
         return key, *values
     
     def __len__(self):
-        return len(self.q)
\ No newline at end of file
+        return len(self.q)
+
+
+class MinMaxHeap:
+    """
+        min-max heap: nodes on even levels are smaller than all their descendants,
+        nodes on odd levels are bigger than all their descendants,
+        so both the smallest and the biggest item can be popped in O(log n)
+    """
+    def __init__(self) -> None:
+        self.a = []
+
+    @staticmethod
+    def _on_min_level(i: int) -> bool:
+        return (i + 1).bit_length() % 2 == 1
+
+    def push(self, item) -> None:
+        a = self.a
+        a.append(item)
+        i = len(a) - 1
+        if i == 0:
+            return
+        p = (i - 1) // 2
+        # first decide which kind of level the item belongs to, then bubble up through grandparents
+        if self._on_min_level(i):
+            if a[i] > a[p]:
+                a[i], a[p] = a[p], a[i]
+                self._bubble_up(p, gt)
+            else:
+                self._bubble_up(i, lt)
+        else:
+            if a[i] < a[p]:
+                a[i], a[p] = a[p], a[i]
+                self._bubble_up(p, lt)
+            else:
+                self._bubble_up(i, gt)
+
+    def _bubble_up(self, i: int, better) -> None:
+        a = self.a
+        while i >= 3:
+            gp = (i - 3) // 4
+            if not better(a[i], a[gp]):
+                break
+            a[i], a[gp] = a[gp], a[i]
+            i = gp
+
+    def _trickle_down(self, i: int, better) -> None:
+        a = self.a
+        n = len(a)
+        while True:
+            # best among children and grandchildren
+            candidates = [c for c in (2*i + 1, 2*i + 2) if c < n]
+            candidates += [g for c in list(candidates) for g in (2*c + 1, 2*c + 2) if g < n]
+            if not candidates:
+                return
+            m = candidates[0]
+            for c in candidates[1:]:
+                if better(a[c], a[m]):
+                    m = c
+            if not better(a[m], a[i]):
+                return
+            a[i], a[m] = a[m], a[i]
+            if m <= 2*i + 2:
+                # m is a child, it is on the other kind of level and has no grandchildren of i below it to fix
+                return
+            p = (m - 1) // 2
+            if better(a[p], a[m]):
+                a[m], a[p] = a[p], a[m]
+            i = m
+
+    def _remove(self, i: int):
+        a = self.a
+        item = a[i]
+        last = a.pop()
+        if i < len(a):
+            a[i] = last
+            self._trickle_down(i, lt if self._on_min_level(i) else gt)
+        return item
+
+    def _max_index(self) -> int:
+        if len(self.a) <= 2:
+            return len(self.a) - 1
+        return 1 if self.a[1] >= self.a[2] else 2
+
+    def peek_min(self):
+        return self.a[0]
+
+    def peek_max(self):
+        return self.a[self._max_index()]
+
+    def pop_min(self):
+        return self._remove(0)
+
+    def pop_max(self):
+        return self._remove(self._max_index())
+
+    def __len__(self):
+        return len(self.a)
+
+
+class BoundedPQ:
+    """
+        priority queue like MyPQ that holds at most maxlen items
+
+        when it is full, pushing drops the item with the worst key (the lowest key when order is 'descending').
+        max_evicted_key is the best key that has been dropped, None if nothing is dropped
+    """
+    def __init__(self, order='ascending', maxlen: int = 1) -> None:
+        assert order == 'ascending' or order == 'descending'
+        assert maxlen >= 1
+        self.q = MinMaxHeap()
+        self.order = order
+        self.maxlen = maxlen
+        self.evicted = 0
+        self.max_evicted_key = None
+
+    def push(self, key, *values):
+        # stored like MyPQ so that ties are popped in the same order
+        _key = -key if self.order == 'descending' else key
+        self.q.push((_key, *values))
+        if len(self.q) > self.maxlen:
+            _key = self.q.pop_max()[0]
+            key = -_key if self.order == 'descending' else _key
+            self.evicted += 1
+            if self.max_evicted_key is None or (key > self.max_evicted_key if self.order == 'descending' else key < self.max_evicted_key):
+                self.max_evicted_key = key
+
+    def extend(self, items):
+        """
+            push many (key, *values) tuples, only the best maxlen of them are ever put into the heap
+        """
+        items = list(items)
+        if len(self.q) == 0 and len(items) > self.maxlen:
+            sign = -1 if self.order == 'descending' else 1
+            kept = set(heapq.nsmallest(self.maxlen, range(len(items)), key=lambda i: sign * items[i][0]))
+            evicted_keys = [items[i][0] for i in range(len(items)) if i not in kept]
+            best_evicted = min(evicted_keys, key=lambda key: sign * key)
+            self.evicted += len(evicted_keys)
+            if self.max_evicted_key is None or sign * best_evicted < sign * self.max_evicted_key:
+                self.max_evicted_key = best_evicted
+            items = [items[i] for i in sorted(kept)]
+        for key, *values in items:
+            self.push(key, *values)
+
+    def pop(self):
+        key, *values = self.q.pop_min()
+        if self.order == 'descending':
+            key = -key
+        return key, *values
+
+    def __len__(self):
+        return len(self.q)
+
+
+class PathStore:
+    """
+        arena of paths that only grow at their two ends, a path is referred to by an integer handle
+
+        a path is its parent path with at most one node added at the front and one at the back,
+        so a new path costs three integers no matter how long it is, instead of a copy of the whole list.
+        -1 means no parent / no node added on that end
+    """
+    def __init__(self) -> None:
+        self.parent = array('q')
+        self.front = array('q')
+        self.back = array('q')
+
+    def new(self, u: int, v: int) -> int:
+        return self.extend(-1, u, v)
+
+    def extend(self, h: int, front: int, back: int) -> int:
+        self.parent.append(h)
+        self.front.append(front)
+        self.back.append(back)
+        return len(self.parent) - 1
+
+    def path(self, h: int) -> list:
+        fronts, backs = [], []
+        while h != -1:
+            if self.front[h] != -1:
+                fronts.append(self.front[h])
+            if self.back[h] != -1:
+                backs.append(self.back[h])
+            h = self.parent[h]
+        backs.reverse()
+        return fronts + backs
+
+    def __len__(self):
+        return len(self.parent)
@@ -0,0 +1,112 @@
+import json
+import os
+
+
+def iter_vrnet_edges(f):
+    """
+        input: opened virtual world file
+        yield: (n1, n2) node pair of every edge block
+
+        the file is a header followed by blocks that start with a '---' line,
+        the first two lines of a block are the "x y" of the two end nodes
+    """
+    block = None
+    for line in f:
+        if line == '---\n':
+            block = []
+        elif block is not None:
+            block.append(tuple(map(int, line.split())))
+            if len(block) == 2:
+                yield block[0], block[1]
+                # skip the rest of this block
+                block = None
+
+
+def iter_phy_obstacles(f):
+    """
+        input: opened physical world file
+        yield: (x, y) of every obstacle, stops after the 'pois' line so the caller can read the size
+    """
+    assert f.readline() == 'obs\n'
+    for line in f:
+        if line == 'pois\n':
+            return
+        x, y = line.split()
+        yield int(x), int(y)
+    raise ValueError('physical world file has no pois line')
+
+
+class JSONStream():
+    """
+        pull parser that reads one JSON document from a text file chunk by chunk
+
+        items() walks an object and yields its keys one at a time, after each key the caller
+        must read the value with value() or walk into it with items() before asking for the next key.
+        only the value being decoded is held in memory, not the whole document
+    """
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, f, chunk_size: int = 1 << 16) -> None:
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        # skip whitespace and return the next character, '' at the end of file
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\n\r':
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos+1]
+
+    def _expect(self, c: str) -> None:
+        if self._peek() != c:
+            raise ValueError(f'expected {c!r} in JSON, got {self._peek()!r}')
+        self.pos += 1
+
+    def value(self):
+        self._peek()
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self.buf, self.pos)
+                # a number at the end of the buffer may continue in the next chunk, and '12.' or '1e'
+                # decodes as the integer before the cut, valid JSON never has '.', 'e' or 'E' after a value
+                if (end < len(self.buf) and self.buf[end] not in '.eE') or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def items(self):
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(':')
+            yield key
+            c = self._peek()
+            self.pos += 1
+            if c == '}':
+                return
+            if c != ',':
+                raise ValueError(f'expected \',\' or \'}}\' in JSON, got {c!r}')
+
+
+def report_throughput(paths: list, seconds: float) -> None:
+    size = sum(os.path.getsize(p) for p in paths)
+    print(f'parsed {size / 2**20:.2f} MB in {seconds:.3f} seconds ({size / 2**20 / max(seconds, 1e-9):.2f} MB/s)')
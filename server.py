@@ -0,0 +1,217 @@
+"""
+    planner server: load the virtual and physical worlds once and answer planning requests from memory
+
+    protocol: one JSON object per line over TCP or a unix socket, one JSON object per line back.
+    requests on one connection are served concurrently and answered as they finish, so use 'id' to match them
+
+    request fields, all optional:
+    - id: echoed back in the response
+    - source: nid of the source, default is the 'Start index' of the mapping file
+    - destinations: list of nid of the destinations, default is the 'Destination index' of the mapping file
+    - alpha, sn, itmax, cost_limit, search_engine, max_queue, phy_search, time_budget: same as the command line options of main.py
+    - replan: default false, update the tfvrnet of the last plan of the same worker and alpha instead of building
+      it again (see main.replan) when at most half of the nodes of interest changed. the search is the same as
+      a cold plan
+    - warm_start: default false, with replan, also start the search from the path of that last plan. the result
+      then depends on the earlier requests of the worker and may differ from a cold plan
+
+    response fields: id, Alpha, Timings, Metrics, Replan (numbers of added and removed nodes and whether the search was
+    warm started, only for incremental plans), Search (Stopped: null, "itmax" or "time budget", Completed: number of
+    nodes inserted into the path of a search stopped by the time budget without being searched, Gap: how much
+    better than the search objective of the path a path it did not search could be, Provably optimal: the search
+    was not stopped and --max-queue evicted no path that could have beaten it),
+    Total cost, Total length, Virtual path (list of nid), Physical path, or Error
+
+    usage:
+    python3 server.py -v vindex_G20.txt -p physical.txt -m G20_tophy.json --port 8765 --server-workers 4
+    echo '{"id": 1, "alpha": 0.5, "destinations": [3, 5, 8]}' | nc localhost 8765
+"""
+from argparse import Namespace
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import json
+
+from cache import PathCache
+from main import check_args, load_worlds, make_parser, plan, replan
+from metrics import METRICS
+
+# request field -> argument name of main.py
+REQUEST_ARGS = {
+    'alpha': 'alpha',
+    'sn': 'sn',
+    'itmax': 'vritmax',
+    'cost_limit': 'cost_limit',
+    'search_engine': 'search_engine',
+    'max_queue': 'max_queue',
+    'phy_search': 'phsearch',
+    'time_budget': 'time_budget',
+}
+
+# (vrnet, phnet, source, destinations, nid to node, base arguments) of the worker process
+_world = None
+# phsearch -> physical sub-path cache of the worker process, kept across requests
+_phcaches = dict()
+# (alpha, tfvrnet engine) -> (tfvrnet, tfvrpath) of the last plan of the worker process
+_last_plans = dict()
+
+
+def init_server_worker(world: tuple) -> None:
+    global _world
+    _world = world
+
+
+def load_world(args) -> tuple:
+    """
+        input: arguments of make_parser with a single alpha
+        return: world for init_server_worker
+
+        also sets args.alpha and forces one process per plan, requests run inside pool workers,
+        which can not start pools of their own
+    """
+    vrnet, source, destinations, phnet, _, _, _, _, _ = load_worlds(args)
+    nid2node = {attr['nid']: n for n, attr in vrnet.nodes(data=True)}
+    args.alpha = args.alphas[0]
+    args.workers = 1
+    args.search_workers = 1
+    return (vrnet, phnet, source, destinations, nid2node, args)
+
+
+def plan_request(request: dict, last: tuple = None) -> tuple:
+    """
+        input: request dict, (tfvrnet, tfvrpath) of an earlier plan with the same alpha to update instead
+            of planning cold when at most half of the nodes of interest changed
+        return: response dict, tfvrnet, tfvrpath of the plan (None if no path was found)
+    """
+    vrnet, phnet, source, destinations, nid2node, base_args = _world
+    args = Namespace(**vars(base_args))
+    for field, arg in REQUEST_ARGS.items():
+        if field in request:
+            setattr(args, arg, request[field])
+    try:
+        if 'source' in request:
+            source = nid2node[request['source']]
+        if 'destinations' in request:
+            destinations = {nid2node[d] for d in request['destinations']}
+    except KeyError as e:
+        return {'Error': f'node {e.args[0]} is not in the largest connected component of the virtual world'}, None, None
+
+    phcache = None
+    if args.phpath_cache_size > 0:
+        if args.phsearch not in _phcaches:
+            _phcaches[args.phsearch] = PathCache(args.phpath_cache_size)
+        phcache = _phcaches[args.phsearch]
+    mark = METRICS.mark()
+    nodes = destinations | {source}
+    if last is not None and len(nodes ^ set(last[0].nodes())) <= len(nodes) // 2:
+        result, tfvrnet, tfvrpath, vrpath, phpath = replan(
+            vrnet, phnet, source, destinations, args, last[0], last[1], phcache, request.get('warm_start', False))
+    else:
+        result, tfvrnet, tfvrpath, vrpath, phpath = plan(vrnet, phnet, source, destinations, args, phcache=phcache)
+    result['Metrics'] = METRICS.since(mark)
+    if vrpath is not None:
+        result['Virtual path'] = [vrnet.nodes[n]['nid'] for n in vrpath]
+        result['Physical path'] = phpath
+    return result, tfvrnet, tfvrpath
+
+
+def serve_request(request: dict) -> dict:
+    """
+        input: request dict
+        return: response dict
+    """
+    base_args = _world[-1]
+    plan_key = (request.get('alpha', base_args.alpha), base_args.tfvrnet_engine)
+    last = _last_plans.pop(plan_key, None)
+    if not request.get('replan', False):
+        last = None
+    result, tfvrnet, tfvrpath = plan_request(request, last)
+    if tfvrpath is not None:
+        _last_plans[plan_key] = (tfvrnet, tfvrpath)
+        # a few alphas are enough, every entry holds a whole tfvrnet
+        if len(_last_plans) > 4:
+            del _last_plans[next(iter(_last_plans))]
+    return result
+
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, pool: ProcessPoolExecutor):
+    loop = asyncio.get_running_loop()
+    write_lock = asyncio.Lock()
+    pending = set()
+
+    async def answer(line: bytes):
+        request = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('request should be a JSON object')
+            response = await loop.run_in_executor(pool, serve_request, request)
+        except Exception as e:
+            response = {'Error': repr(e)}
+        if isinstance(request, dict) and 'id' in request:
+            response = {'id': request['id'], **response}
+        async with write_lock:
+            writer.write((json.dumps(response) + '\n').encode())
+            await writer.drain()
+
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        if line.strip():
+            task = asyncio.create_task(answer(line))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.gather(*pending)
+    writer.close()
+
+
+async def serve(args, pool: ProcessPoolExecutor) -> None:
+    def handler(reader, writer):
+        return handle_connection(reader, writer, pool)
+
+    # requests with many destinations can be long lines
+    if args.unix:
+        server = await asyncio.start_unix_server(handler, path=args.unix, limit=2**24)
+        print(f'serving on unix socket {args.unix}')
+    else:
+        server = await asyncio.start_server(handler, host=args.host, port=args.port, limit=2**24)
+        print(f'serving on {args.host}:{args.port}')
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = make_parser()
+    parser.add_argument('--host',
+                        dest='host',
+                        type=str,
+                        default='127.0.0.1'
+                        )
+    parser.add_argument('--port',
+                        dest='port',
+                        type=int,
+                        default=8765
+                        )
+    parser.add_argument('--unix',
+                        dest='unix',
+                        type=str,
+                        help='listen on this unix socket path instead of TCP'
+                        )
+    parser.add_argument('--server-workers',
+                        dest='server_workers',
+                        type=int,
+                        default=1,
+                        help='number of processes that serve requests'
+                        )
+    args = parser.parse_args()
+    check_args(parser, args, single_alpha=True)
+
+    world = load_world(args)
+
+    # the worlds are sent to every worker once, then only requests and responses cross processes
+    with ProcessPoolExecutor(args.server_workers, initializer=init_server_worker, initargs=(world,)) as pool:
+        try:
+            asyncio.run(serve(args, pool))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from grid import DIRECTIONS, PhyGrid, reach_lengths
+
+
+def brute_reach(free: np.ndarray, dx: int, dy: int) -> np.ndarray:
+    length, width = free.shape
+    reach = np.zeros((length, width), dtype=np.int64)
+    for x in range(length):
+        for y in range(width):
+            n, nx, ny = 0, x + dx, y + dy
+            while 0 <= nx < length and 0 <= ny < width and free[nx, ny]:
+                n, nx, ny = n + 1, nx + dx, ny + dy
+            reach[x, y] = n
+    return reach
+
+
+@pytest.mark.parametrize('shape', [(1, 1), (1, 9), (9, 1), (7, 13), (20, 6)])
+@pytest.mark.parametrize('density', [0.0, 0.2, 0.6])
+def test_reach_lengths_match_brute_force(shape, density):
+    rng = np.random.default_rng(shape[0] * 100 + shape[1])
+    free = rng.random(shape) >= density
+    for dx, dy in DIRECTIONS:
+        assert np.array_equal(reach_lengths(free, dx, dy), brute_reach(free, dx, dy)), (dx, dy)
+
+
+def test_phygrid_reach_is_stacked_in_direction_order():
+    rng = np.random.default_rng(3)
+    obstacle = rng.random((11, 8)) < 0.3
+    grid = PhyGrid(obstacle)
+    for d, (dx, dy) in enumerate(DIRECTIONS):
+        assert np.array_equal(grid.reach[d], brute_reach(~obstacle, dx, dy))
@@ -0,0 +1,63 @@
+from importlib.util import find_spec
+import random
+
+import networkx as nx
+import pytest
+
+from algo import find_tfvrpath
+from gen_world import write_world
+from nets import get_vrnet, make_tfvrnet, update_tfvrnet
+
+
+@pytest.fixture(scope='module', params=[0, 1])
+def world(request, tmp_path_factory):
+    """
+        small generated virtual world: vrnet, source, destinations
+    """
+    prefix = str(tmp_path_factory.mktemp('world') / 'syn')
+    virtual_path, _, mapping_path = write_world(prefix, 300, 3, 25, 40, 40, 0.2, seed=request.param)
+    return get_vrnet(virtual_path, mapping_path)
+
+
+def assert_same_tfvrnet(tfvrnet: nx.Graph, expected: nx.Graph) -> None:
+    # find_tfvrpath breaks ties by node and edge order, so the order has to be the same too
+    assert list(tfvrnet.nodes()) == list(expected.nodes())
+    assert list(tfvrnet.edges()) == list(expected.edges())
+    assert [list(tfvrnet.adj[n]) for n in tfvrnet] == [list(expected.adj[n]) for n in expected]
+    for u, v, attr in expected.edges(data=True):
+        assert tfvrnet.edges[u, v]['weight'] == attr['weight']
+        assert tfvrnet.edges[u, v]['path'] == attr['path']
+
+
+def test_dijkstra_engine_matches_pairwise(world):
+    vrnet, source, destinations = world
+    pairwise = make_tfvrnet(vrnet, source, destinations, 0.5, 'pairwise')
+    assert_same_tfvrnet(make_tfvrnet(vrnet, source, destinations, 0.5, 'dijkstra'), pairwise)
+
+
+def test_workers_match_serial(world):
+    vrnet, source, destinations = world
+    serial = make_tfvrnet(vrnet, source, destinations, 0.5, 'dijkstra')
+    assert_same_tfvrnet(make_tfvrnet(vrnet, source, destinations, 0.5, 'dijkstra', workers=3), serial)
+
+
+@pytest.mark.parametrize('engine', [
+    'pairwise', 'dijkstra', 'oracle',
+    pytest.param('csgraph', marks=pytest.mark.skipif(find_spec('scipy') is None, reason='needs scipy'))
+])
+def test_update_tfvrnet_matches_cold_build(world, engine):
+    vrnet, source, destinations = world
+    rng = random.Random(engine)
+    tfvrnet = make_tfvrnet(vrnet, source, destinations, 0.5, engine)
+    edges_before = list(tfvrnet.edges(data='path'))
+    others = sorted(n for n in vrnet.nodes() if n not in destinations and n != source)
+    for _ in range(3):
+        # a few destinations are replaced, like the changes replan is for
+        new = set(destinations) - set(rng.sample(sorted(destinations), 3)) | set(rng.sample(others, 3))
+        updated, added, removed = update_tfvrnet(tfvrnet, vrnet, source, new, 0.5, engine)
+        cold = make_tfvrnet(vrnet, source, new, 0.5, engine)
+        assert set(added) == new - destinations and removed == destinations - new
+        assert_same_tfvrnet(updated, cold)
+        assert find_tfvrpath(updated, 5000, -1) == find_tfvrpath(cold, 5000, -1)
+    # the tfvrnet it starts from is not changed
+    assert list(tfvrnet.edges(data='path')) == edges_before
@@ -0,0 +1,37 @@
+import random
+
+import networkx as nx
+import pytest
+
+from oracle import HubLabels
+
+
+def random_vrnet(seed: int) -> nx.Graph:
+    rng = random.Random(seed)
+    vrnet = nx.gnm_random_graph(60, 150, seed=seed)
+    # a second component to check unconnected pairs
+    vrnet.add_edge(100, 101)
+    for u, v in vrnet.edges():
+        # integer weights have ties between shortest paths
+        vrnet[u][v]['weight'] = rng.choice([rng.randint(1, 5), rng.random() * 10])
+    return vrnet
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_hublabels_match_dijkstra(seed):
+    vrnet = random_vrnet(seed)
+    labels = HubLabels.build(vrnet)
+    rng = random.Random(seed)
+    nodes = list(vrnet.nodes())
+    for _ in range(300):
+        u, v = rng.choice(nodes), rng.choice(nodes)
+        if not nx.has_path(vrnet, u, v):
+            with pytest.raises(nx.NetworkXNoPath):
+                labels.path(u, v)
+            continue
+        expected = nx.dijkstra_path_length(vrnet, u, v)
+        path, weight = labels.path(u, v)
+        assert path[0] == u and path[-1] == v
+        assert weight == pytest.approx(expected)
+        assert labels.distance(u, v) == pytest.approx(expected)
+        assert sum(vrnet[a][b]['weight'] for a, b in zip(path, path[1:])) == pytest.approx(expected)
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from pq import BoundedPQ, MinMaxHeap, MyPQ
+
+
+def test_minmaxheap_matches_sorted_list():
+    rng = random.Random(0)
+    for _ in range(50):
+        heap, items = MinMaxHeap(), []
+        for _ in range(200):
+            op = rng.random()
+            if op < 0.6 or not items:
+                item = (rng.randint(0, 30), rng.random())
+                heap.push(item)
+                items.append(item)
+            elif op < 0.8:
+                items.sort()
+                assert heap.peek_min() == items[0]
+                assert heap.pop_min() == items.pop(0)
+            else:
+                items.sort()
+                assert heap.peek_max() == items[-1]
+                assert heap.pop_max() == items.pop()
+            assert len(heap) == len(items)
+
+
+@pytest.mark.parametrize('order', ['ascending', 'descending'])
+@pytest.mark.parametrize('maxlen', [1, 3, 17])
+def test_boundedpq_keeps_the_best_maxlen(order, maxlen):
+    rng = random.Random(maxlen)
+    sign = -1 if order == 'descending' else 1
+    for _ in range(30):
+        pq = BoundedPQ(order, maxlen)
+        items = [(rng.randint(0, 20), i) for i in range(rng.randint(0, 60))]
+        if rng.random() < 0.5:
+            pq.extend(items)
+        else:
+            for key, i in items:
+                pq.push(key, i)
+        ranked = sorted(items, key=lambda item: (sign * item[0], item[1]))
+        kept, dropped = ranked[:maxlen], ranked[maxlen:]
+        assert len(pq) == len(kept)
+        assert pq.evicted == len(dropped)
+        assert pq.max_evicted_key == (dropped[0][0] if dropped else None)
+        assert [pq.pop() for _ in range(len(pq))] == kept
+
+
+@pytest.mark.parametrize('order', ['ascending', 'descending'])
+def test_boundedpq_pops_like_mypq_when_not_full(order):
+    rng = random.Random(1)
+    items = [(rng.randint(0, 5), rng.randint(0, 5)) for _ in range(100)]
+    bounded, plain = BoundedPQ(order, len(items)), MyPQ(order)
+    for key, value in items:
+        bounded.push(key, value)
+        plain.push(key, value)
+    assert [bounded.pop() for _ in items] == [plain.pop() for _ in items]
@@ -0,0 +1,40 @@
+import io
+import json
+
+import pytest
+
+from reader import JSONStream
+
+DOCUMENT = {
+    'Start index': 0,
+    'Destination index': {str(i): 1000 * i + 7 for i in range(40)},
+    'empty': {},
+    'values': [1.5, -2e-3, 123456789, 'a "quoted" \\ string', 'ünïcode', True, False, None, [], {'x': [1, {}]}],
+    'nested': {'a': {'b': {'c': 12345.678}}, '': 'empty key'},
+}
+
+
+def walk(js: JSONStream) -> dict:
+    # objects are walked with items() like the mapping reader does, everything else is read with value()
+    obj = dict()
+    for key in js.items():
+        if js._peek() == '{':
+            obj[key] = walk(js)
+        else:
+            obj[key] = js.value()
+    return obj
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 1 << 16])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_jsonstream_matches_json_load(chunk_size, indent):
+    text = json.dumps(DOCUMENT, indent=indent, ensure_ascii=False)
+    assert walk(JSONStream(io.StringIO(text), chunk_size)) == json.loads(text)
+    assert JSONStream(io.StringIO(text), chunk_size).value() == json.loads(text)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5])
+def test_jsonstream_rejects_broken_documents(chunk_size):
+    for text in ['{"a": 1 "b": 2}', '{"a" 1}', '{"a": [1, 2}']:
+        with pytest.raises(ValueError):
+            walk(JSONStream(io.StringIO(text), chunk_size))